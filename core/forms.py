@@ -1,10 +1,10 @@
 from django.forms import ModelForm, Form, CharField
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth.hashers import check_password
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from core.models import *
+from core.hashing import check_password
 
 class SignupForm(ModelForm):
     """Creates a user object."""
@@ -65,7 +65,8 @@ class UpdatePasswordForm(ModelForm):
     def clean_current(self):
         """Checks that the supplied current password is currect."""
 
-        if not check_password(self.data["current"], self.instance.password):
+        valid, _ = check_password(self.data["current"], self.instance.password)
+        if not valid:
             self.add_error("current", "Current password not correct.")
         return self.data["current"]
 
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import hashers
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher, with its cost taken from the PASSWORD_ITERATIONS
+    setting. Hashes made with fewer iterations are upgraded the next time
+    their password is checked."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
+
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing service is too busy to take on more work. Its
+    message is a JSON error, so it is passed on to GraphQL clients."""
+
+    def __init__(self):
+        Exception.__init__(self, json.dumps({"error": "Server busy, try again shortly"}))
+
+
+
+def setup_worker():
+    """Prepares a worker process to use Django's hashers, if it isn't ready
+    already - as it will be if it was forked from a process that was."""
+
+    if not apps.ready:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+        django.setup()
+
+
+def encode_password(password):
+    """Hashes a password."""
+
+    setup_worker()
+    return hashers.make_password(password)
+
+
+def verify_password(password, encoded):
+    """Checks a password against a hash, returning whether it matches and, if
+    it does but the hash is out of date, a new hash."""
+
+    setup_worker()
+    updated = []
+    valid = hashers.check_password(
+        password, encoded, setter=lambda raw: updated.append(hashers.make_password(raw))
+    )
+    return valid, updated[0] if updated else None
+
+
+
+class HashingService:
+    """Runs password hashing in a pool of worker processes, so that it doesn't
+    use the CPU time of the processes serving requests.
+
+    At most some number of hashes can be in the service at once, running or
+    waiting for a worker. Callers wait a limited time for a place, and if
+    none comes free a HashingBusy exception is raised - so a burst of logins
+    is turned away rather than tying up every request worker. With no
+    workers, hashing is done in the calling process, but still limited."""
+
+    def __init__(self, workers, limit, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(limit)
+        self.pool = None
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+
+    def run(self, function, *args):
+        """Calls a function with the arguments given in a worker process, and
+        returns the result. If the pool breaks while it's running, it's tried
+        once more in a new pool."""
+
+        start = time.perf_counter()
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.lock: self.stats["rejected"] += 1
+            raise HashingBusy
+        try:
+            with self.lock:
+                self.stats["in_service"] += 1
+                self.stats["peak_in_service"] = max(
+                    self.stats["peak_in_service"], self.stats["in_service"]
+                )
+                self.stats["slot_wait"] += time.perf_counter() - start
+            if self.workers:
+                try:
+                    return self.submit(function, *args)
+                except BrokenProcessPool:
+                    return self.submit(function, *args)
+            return function(*args)
+        finally:
+            self.slots.release()
+            with self.lock:
+                self.stats["in_service"] -= 1
+                self.stats["completed"] += 1
+                self.stats["total_time"] += time.perf_counter() - start
+
+
+    def submit(self, function, *args):
+        """Runs a function in the pool of worker processes, creating it if
+        there isn't one. If a worker dies - if it's killed for using too much
+        memory, say - the pool can't be used again, so it's shut down and
+        the next call creates a new one."""
+
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+            pool = self.pool
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = None
+                    self.stats["broken_pools"] += 1
+            pool.shutdown(wait=False)
+            raise
+
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """Returns the hashing service for this process, configured by the
+    PASSWORD_HASHING_WORKERS, PASSWORD_HASHING_LIMIT and
+    PASSWORD_HASHING_TIMEOUT settings."""
+
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HashingService(
+                settings.PASSWORD_HASHING_WORKERS,
+                settings.PASSWORD_HASHING_LIMIT,
+                settings.PASSWORD_HASHING_TIMEOUT
+            )
+        return _service
+
+
+def make_password(password):
+    """Hashes a password using the hashing service."""
+
+    return get_service().run(encode_password, password)
+
+
+def check_password(password, encoded):
+    """Checks a password against a hash using the hashing service. Returns
+    whether it matches and, if the hash needs upgrading, a new hash."""
+
+    return get_service().run(verify_password, password, encoded)
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_remove_sample_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='membership_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
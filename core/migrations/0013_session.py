@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-16 14:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_user_membership_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Session',
+            fields=[
+                ('jti', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('issued', models.IntegerField()),
+                ('last_used', models.IntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='core.User')),
+            ],
+            options={
+                'db_table': 'sessions',
+            },
+        ),
+    ]
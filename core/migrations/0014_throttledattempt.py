@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-16 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottledAttempt',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=128)),
+                ('time', models.FloatField(db_index=True)),
+            ],
+            options={
+                'db_table': 'throttled_attempts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='throttledattempt',
+            index=models.Index(fields=['key', 'time'], name='throttled_a_key_429a5c_idx'),
+        ),
+    ]
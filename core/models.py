@@ -1,12 +1,23 @@
 import time
 import jwt
+import secrets
 import base64
 from random import randint
 from django_random_id_model import RandomIDModel
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.contrib.auth.hashers import make_password
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .tokens import verify_token, users, revoked
+from .hashing import make_password
+
+USER_CACHE_TTL = 60
+UNCACHED_USER_FIELDS = [
+    "email", "password", "password_reset_token", "password_reset_token_expiry"
+]
+REFRESH_TOKEN_LIFETIME = 31536000
+REFRESH_TOKEN_RENEWAL = 2592000
 
 def create_filename(instance, filename):
     """Creates a filename for some uploaded image, from the owning object's ID,
@@ -39,6 +50,7 @@ class User(RandomIDModel):
     image = models.ImageField(default="", upload_to=create_filename)
     password_reset_token = models.CharField(default="", max_length=128)
     password_reset_token_expiry = models.IntegerField(default=0)
+    membership_version = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} ({self.username})"
@@ -50,53 +62,246 @@ class User(RandomIDModel):
         to an actual user, returns that user."""
 
         try:
-            token = jwt.decode(token, settings.SECRET_KEY)
-            assert token["expires"] > time.time()
-            user = User.objects.get(id=token["sub"])
+            token = verify_token(token)
+            assert "jti" not in token
+            user = User.cached(token["sub"])
+            memberships = token.get("memberships")
+            if memberships and memberships["version"] == user.membership_version:
+                user.memberships = memberships
         except: user = None
         return user
     
 
+    @staticmethod
+    def from_refresh_token(token):
+        """Takes a refresh JWT, and if it's signed properly, isn't expired, and
+        its session hasn't been revoked, returns the user it was issued to,
+        with the token's claims as its refresh_claims attribute.
+
+        Revoked sessions are remembered, so a revoked token used again is
+        turned away without a query. Otherwise the session's last use is
+        recorded and its existence checked in one indexed update."""
+
+        try:
+            claims = verify_token(token)
+            assert not revoked.get(claims["jti"])
+            if not Session.objects.filter(jti=claims["jti"], user=claims["sub"]).update(
+                last_used=int(time.time())
+            ):
+                revoked.set(claims["jti"], True, claims["expires"])
+                return None
+            user = User.cached(claims["sub"])
+            user.refresh_claims = claims
+        except: user = None
+        return user
+    
+
+    @staticmethod
+    def cached(id):
+        """Gets a user by ID, using a cache of recently fetched users' rows.
+        Each call gets a User object of its own. Users are dropped from the
+        cache whenever they are saved or deleted, and after USER_CACHE_TTL
+        seconds regardless - which bounds how long changes made by other
+        processes can go unnoticed.
+
+        The fields in UNCACHED_USER_FIELDS are never cached - they are left
+        deferred, and read from the database if they are used. The object
+        remembers the values it was created with, so that saving it only
+        writes the fields that have since been changed, rather than writing
+        possibly stale values over changes made elsewhere."""
+
+        fields = [
+            f.attname for f in User._meta.concrete_fields
+            if f.name not in UNCACHED_USER_FIELDS
+        ]
+        values = users.get(id)
+        if values is None:
+            values = User.objects.filter(id=id).values_list(*fields).get()
+            users.set(id, values, time.time() + USER_CACHE_TTL)
+        user = User.from_db(User.objects.db, fields, values)
+        user.cached_values = dict(zip(fields, values))
+        return user
+    
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Reloads fields from the database. If the user came from the cache,
+        the values loaded are remembered as the fields' unchanged values."""
+
+        super(User, self).refresh_from_db(using=using, fields=fields)
+        cached_values = getattr(self, "cached_values", None)
+        if cached_values is not None:
+            for f in self._meta.concrete_fields:
+                if f.attname in self.__dict__ and (
+                    fields is None or f.name in fields or f.attname in fields
+                ):
+                    cached_values[f.attname] = self.__dict__[f.attname]
+    
+
     def save(self, *args, **kwargs):
         """If the model is being saved for the first time, set the creation
-        time."""
+        time. Otherwise the membership version is left as it is in the
+        database, as it may have changed since this user was fetched - and if
+        the user came from the cache, only fields changed since are saved."""
         
+        cached_values = getattr(self, "cached_values", None)
         if not self.id:
             self.creation_time = int(time.time())
+        elif not self._state.adding and "update_fields" not in kwargs:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != "membership_version" and (
+                    cached_values is None or self.field_changed(f)
+                )
+            ]
         super(User, self).save(*args, **kwargs)
+        if cached_values is not None:
+            for f in self._meta.concrete_fields:
+                if f.attname in self.__dict__:
+                    cached_values[f.attname] = self.__dict__[f.attname]
+    
+
+    def field_changed(self, field):
+        """Determines if a field of a user from the cache has been given a
+        value other than the one it was created or last loaded with."""
+
+        if field.attname not in self.__dict__: return False
+        if field.attname not in self.cached_values: return True
+        value = self.__dict__[field.attname]
+        if getattr(value, "_committed", True) is False: return True
+        return value != self.cached_values[field.attname]
     
 
     def set_password(self, password):
         """"Sets the user's password, salting and hashing whatever is given
-        using Django's built in functions."""
+        using Django's built in functions. Any sessions the user has are
+        revoked."""
 
         self.password = make_password(password)
         self.save()
+        if self.id: Session.revoke(Session.objects.filter(user=self))
     
 
-    def make_access_jwt(self):
+    def make_access_jwt(self, memberships=True):
         """Creates and signs an access token indicating the user who signed and
         the time it was signed. It will also indicate that it expires in 15
-        minutes."""
+        minutes.
+        
+        By default it also carries a snapshot of the groups the user belongs
+        to and is an admin of, labelled with the membership version they were
+        read after, so that permission checks don't need to query them."""
         
         now = int(time.time())
-        return jwt.encode({
-            "sub": self.id, "iat": now, "expires": now + 900
-        }, settings.SECRET_KEY, algorithm="HS256").decode()
+        claims = {"sub": self.id, "iat": now, "expires": now + 900}
+        if memberships:
+            claims["memberships"] = {
+                "version": self.membership_version,
+                "groups": list(self.groups.values_list("id", flat=True)),
+                "admin_groups": list(self.admin_groups.values_list("id", flat=True))
+            }
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm="HS256").decode()
+    
+
+    def group_ids(self, admin=False):
+        """The IDs of the groups the user belongs to, or is an admin of. These
+        come from the user's access token if it had an up to date snapshot of
+        them, and from the database otherwise.
+
+        The user's row may have come from the user cache, and so be out of
+        date, so the snapshot's version is checked against the database the
+        first time it's needed - one lookup of one column, however many
+        checks the request makes."""
+
+        memberships = getattr(self, "memberships", None)
+        if memberships and not getattr(self, "memberships_checked", False):
+            version = User.objects.filter(id=self.id).values_list(
+                "membership_version", flat=True
+            ).first()
+            if version == memberships["version"]:
+                self.memberships_checked = True
+            else:
+                memberships = self.memberships = None
+        if memberships: return memberships["admin_groups" if admin else "groups"]
+        return list((self.admin_groups if admin else self.groups).values_list(
+            "id", flat=True
+        ))
+    
+
+    def is_member_of(self, group_id):
+        """Determines if the user belongs to the group with a given ID."""
+
+        try:
+            return int(group_id) in self.group_ids()
+        except (TypeError, ValueError): return False
+    
+
+    def is_admin_of(self, group_id):
+        """Determines if the user is an admin of the group with a given ID."""
+
+        try:
+            return int(group_id) in self.group_ids(admin=True)
+        except (TypeError, ValueError): return False
     
 
     def make_refresh_jwt(self):
         """Creates and signs an refresh token indicating the user who signed and
         the time it was signed. It will also indicate that it expires in 365
-        days."""
+        days. A session is created for it, identified by the token's jti, so
+        that it can be revoked."""
         
         now = int(time.time())
+        session = Session.objects.create(
+            jti=secrets.token_hex(16), user=self, issued=now, last_used=now
+        )
+        Session.objects.filter(user=self, issued__lt=now - REFRESH_TOKEN_LIFETIME).delete()
         return jwt.encode({
-            "sub": self.id, "iat": now, "expires": now + 31536000
+            "sub": self.id, "jti": session.jti, "iat": now,
+            "expires": now + REFRESH_TOKEN_LIFETIME
         }, settings.SECRET_KEY, algorithm="HS256").decode()
 
 
 
+@receiver([post_save, post_delete], sender=User)
+def forget_user(sender, instance, **kwargs):
+    """Removes a user from the user cache when it changes."""
+
+    users.pop(instance.id)
+
+
+
+class Session(models.Model):
+    """A refresh token issued to a user. The token is only accepted while its
+    session exists, so deleting the session revokes it."""
+
+    class Meta:
+        db_table = "sessions"
+
+    jti = models.CharField(max_length=32, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sessions")
+    issued = models.IntegerField()
+    last_used = models.IntegerField()
+
+    @staticmethod
+    def revoke(sessions):
+        """Deletes some sessions, and remembers in this process that their
+        tokens are revoked."""
+
+        sessions = list(sessions.values_list("jti", "issued"))
+        Session.objects.filter(jti__in=[jti for jti, _ in sessions]).delete()
+        for jti, issued in sessions:
+            revoked.set(jti, True, issued + REFRESH_TOKEN_LIFETIME)
+    
+
+    @staticmethod
+    def revoke_token(token):
+        """Revokes the session of a refresh token, if it is one."""
+
+        try:
+            jti = verify_token(token)["jti"]
+        except: return
+        Session.revoke(Session.objects.filter(jti=jti))
+
+
+
 class Group(RandomIDModel):
     """A group that a user belongs to."""
 
@@ -114,6 +319,45 @@ class Group(RandomIDModel):
 
 
 
+def change_memberships(user_ids):
+    """Records that the group memberships of some users have changed, by
+    incrementing their membership versions, so that the snapshots of their
+    memberships in existing access tokens are no longer trusted."""
+
+    user_ids = list(user_ids)
+    User.objects.filter(id__in=user_ids).update(
+        membership_version=models.F("membership_version") + 1
+    )
+    for id in user_ids: users.pop(id)
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+@receiver(m2m_changed, sender=Group.admins.through)
+def memberships_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Changes the membership versions of users added to or removed from a
+    group, or made or unmade an admin of one."""
+
+    if reverse:
+        if action in ["post_add", "post_remove", "post_clear"]:
+            change_memberships([instance.id])
+    elif action in ["post_add", "post_remove"]:
+        change_memberships(pk_set)
+    elif action == "pre_clear":
+        related = instance.users if sender is Group.users.through else instance.admins
+        change_memberships(related.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    """Changes the membership versions of everyone in a group being
+    deleted."""
+
+    change_memberships(set(instance.users.values_list("id", flat=True)) | set(
+        instance.admins.values_list("id", flat=True)
+    ))
+
+
+
 class GroupInvitation(RandomIDModel):
     """An invitation to a group."""
 
@@ -171,40 +415,58 @@ class Collection(RandomIDModel):
         super(Collection, self).save(*args, **kwargs)
     
 
+    @staticmethod
+    def permissions(user, ids):
+        """Works out what a user can do with each of some collections, in a
+        single query. Returns a dict mapping each collection ID that exists to
+        whether the user can view, edit and execute it.
+
+        Anyone can view a public collection. The owner can do everything.
+        Users linked to a collection, or in a group linked to it, can view it,
+        and can edit or execute it if any of those links allow it."""
+
+        collections = Collection.objects.filter(id__in=ids)
+        if not user:
+            return {id: (not private, False, False) for id, private in
+                collections.values_list("id", "private")}
+        user_links = CollectionUserLink.objects.filter(
+            collection=models.OuterRef("id"), user=user.id
+        )
+        group_links = CollectionGroupLink.objects.filter(
+            collection=models.OuterRef("id"), group__users=user.id
+        )
+        annotations = {}
+        for name, links in [["user", user_links], ["group", group_links]]:
+            annotations[f"{name}_view"] = models.Exists(links)
+            annotations[f"{name}_edit"] = models.Exists(links.filter(can_edit=True))
+            annotations[f"{name}_execute"] = models.Exists(links.filter(can_execute=True))
+        permissions = {}
+        for row in collections.annotate(**annotations).values(
+            "id", "private", "owner", *annotations
+        ):
+            owner = row["owner"] == user.id
+            permissions[row["id"]] = (
+                owner or not row["private"] or row["user_view"] or row["group_view"],
+                owner or row["user_edit"] or row["group_edit"],
+                owner or row["user_execute"] or row["group_execute"]
+            )
+        return permissions
+    
+
     def editable_by(self, user):
         """Determines if a user should be able to edit the collection."""
 
-        if user is None: return False
-        if self.owner == user: return True
-        if self.users.filter(id=user.id):
-            if self.collectionuserlink_set.get(user=user).can_edit: return True
-        user_groups = list(user.groups.all())
-        collection_groups = list(self.groups.all())
-        for user_group in user_groups:
-            for collection_group in collection_groups:
-                if user_group.id == collection_group.id:
-                    return self.collectiongrouplink_set.get(
-                        group=collection_group
-                    ).can_edit
-        return False
+        return Collection.permissions(user, [self.id]).get(
+            self.id, (False, False, False)
+        )[1]
     
 
     def executable_by(self, user):
-        """Determines if a user should be able to edit the collection."""
+        """Determines if a user should be able to execute the collection."""
 
-        if user is None: return False
-        if self.owner == user: return True
-        if self.users.filter(id=user.id):
-            if self.collectionuserlink_set.get(user=user).can_execute: return True
-        user_groups = list(user.groups.all())
-        collection_groups = list(self.groups.all())
-        for user_group in user_groups:
-            for collection_group in collection_groups:
-                if user_group == collection_group:
-                    return self.collectiongrouplink_set.get(
-                        group=collection_group
-                    ).can_execute
-        return False
+        return Collection.permissions(user, [self.id]).get(
+            self.id, (False, False, False)
+        )[2]
 
 
 
@@ -275,4 +537,18 @@ class Sample(RandomIDModel):
         
         if self.id:
             self.last_modified = int(time.time())
-        super(Sample, self).save(*args, **kwargs)
\ No newline at end of file
+        super(Sample, self).save(*args, **kwargs)
+
+
+
+class ThrottledAttempt(models.Model):
+    """An attempt at a throttled action, such as logging in, recorded against
+    one of the things it is limited by - an IP address, username or
+    email."""
+
+    class Meta:
+        db_table = "throttled_attempts"
+        indexes = [models.Index(fields=["key", "time"])]
+
+    key = models.CharField(max_length=128)
+    time = models.FloatField(db_index=True)
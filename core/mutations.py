@@ -3,10 +3,11 @@ import json
 import secrets
 import graphene
 from graphql import GraphQLError
-from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
-from core.models import User
+from core.models import User, Session
 from core.forms import *
+from core.hashing import check_password
+from core.throttle import throttle
 from core.email import send_welcome_email, send_reset_email, send_reset_warning_email
 from core.arguments import create_mutation_arguments
 
@@ -18,6 +19,7 @@ class SignupMutation(graphene.Mutation):
     user = graphene.Field("core.queries.UserType")
 
     def mutate(self, info, **kwargs):
+        throttle("signup", info.context, email=kwargs.get("email"))
         form = SignupForm(kwargs)
         if form.is_valid():
             form.instance.last_login = time.time()
@@ -44,11 +46,14 @@ class LoginMutation(graphene.Mutation):
     user = graphene.Field("core.queries.UserType")
 
     def mutate(self, info, **kwargs):
+        throttle("login", info.context, username=kwargs["username"])
         user = User.objects.filter(username=kwargs["username"]).first()
         if user:
-            if check_password(kwargs["password"], user.password):
+            valid, new_password = check_password(kwargs["password"], user.password)
+            if valid:
                 info.context.refresh_token = user.make_refresh_jwt()
                 user.last_login = time.time()
+                if new_password: user.password = new_password
                 user.save()
                 return LoginMutation(access_token=user.make_access_jwt(), user=user)
         raise GraphQLError(json.dumps({"username": "Invalid credentials"}))
@@ -60,6 +65,8 @@ class LogoutMutation(graphene.Mutation):
     success = graphene.Boolean()
 
     def mutate(self, info, **kwargs):
+        token = info.context.COOKIES.get("refresh_token")
+        if token: Session.revoke_token(token)
         info.context.refresh_token = False
         return LogoutMutation(success=True)
 
@@ -94,6 +101,7 @@ class UpdatePasswordMutation(graphene.Mutation):
         form = UpdatePasswordForm(kwargs, instance=info.context.user)
         if form.is_valid():
             form.save()
+            info.context.refresh_token = info.context.user.make_refresh_jwt()
             return UpdatePasswordMutation(success=True)
         raise GraphQLError(json.dumps(form.errors))
 
@@ -107,6 +115,7 @@ class RequestPasswordResetMutation(graphene.Mutation):
     success = graphene.Boolean()
 
     def mutate(self, info, **kwargs):
+        throttle("requestPasswordReset", info.context, email=kwargs["email"])
         matches = User.objects.filter(email=kwargs["email"])
         random_token = secrets.token_hex(64)
         reset_url = info.context.META.get(
@@ -218,7 +227,7 @@ class UpdateGroupMutation(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["id"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["id"]):
+        if not info.context.user.is_admin_of(kwargs["id"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         form = GroupForm(kwargs, instance=group.first())
         if form.is_valid():
@@ -241,7 +250,7 @@ class DeleteGroupMutation(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["id"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["id"]):
+        if not info.context.user.is_admin_of(kwargs["id"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         group.first().delete()
         return DeleteGroupMutation(success=True, user=info.context.user)
@@ -261,7 +270,7 @@ class InviteUserToGroup(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["group"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["group"]):
+        if not info.context.user.is_admin_of(kwargs["group"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         user = User.objects.filter(id=kwargs["user"])
         if not user: raise GraphQLError('{"user": ["Does not exist"]}')
@@ -290,7 +299,7 @@ class DeleteGroupInvitationMutation(graphene.Mutation):
         invitation = GroupInvitation.objects.filter(id=kwargs["id"])
         if not invitation: raise GraphQLError('{"invitation": ["Does not exist"]}')
         if invitation.first().user != info.context.user:
-            if not invitation.first().group.admins.filter(id=info.context.user.id):
+            if not info.context.user.is_admin_of(invitation.first().group_id):
                 raise GraphQLError('{"invitation": ["Does not exist"]}')
         invitation.first().delete()
         return DeleteGroupInvitationMutation(success=True, user=info.context.user)
@@ -333,7 +342,7 @@ class MakeGroupAdminMutation(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["group"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["group"]):
+        if not info.context.user.is_admin_of(kwargs["group"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         user = User.objects.filter(id=kwargs["user"])
         if not user: raise GraphQLError('{"user": ["Does not exist"]}')
@@ -360,7 +369,7 @@ class RevokeGroupAdminMutation(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["group"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["group"]):
+        if not info.context.user.is_admin_of(kwargs["group"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         user = User.objects.filter(id=kwargs["user"])
         if not user: raise GraphQLError('{"user": ["Does not exist"]}')
@@ -386,7 +395,7 @@ class RemoveUserFromGroup(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
         group = Group.objects.filter(id=kwargs["group"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if not info.context.user.admin_groups.filter(id=kwargs["group"]):
+        if not info.context.user.is_admin_of(kwargs["group"]):
             raise GraphQLError('{"group": ["Not an admin"]}')
         user = User.objects.filter(id=kwargs["user"])
         if not user: raise GraphQLError('{"user": ["Does not exist"]}')
@@ -411,10 +420,10 @@ class LeaveGroup(graphene.Mutation):
             raise GraphQLError(json.dumps({"error": ["Not authorized"]}))
         group = Group.objects.filter(id=kwargs["id"])
         if not group: raise GraphQLError('{"group": ["Does not exist"]}')
-        if group.first().users.filter(id=info.context.user.id).count() == 0:
+        if not info.context.user.is_member_of(group.first().id):
             raise GraphQLError('{"group": ["Not in group"]}')
         if group.first().admins.count() == 1:
-            if group.first().admins.filter(id=info.context.user.id).count():
+            if info.context.user.is_admin_of(group.first().id):
                 raise GraphQLError('{"group": ["If you left there would be no admins"]}')
         group.first().users.remove(info.context.user)
         return LeaveGroup(group=group.first(), user=info.context.user)
\ No newline at end of file
@@ -1,8 +1,38 @@
 import graphene
+from promise import Promise
+from promise.dataloader import DataLoader
 from graphene_django.types import DjangoObjectType
 from graphene.relay import Connection, ConnectionField
 from .models import *
 
+class CollectionPermissionLoader(DataLoader):
+    """Loads what a user can do with collections, batching together all the
+    collections asked about while a query resolves, so that the permissions
+    of a whole list of collections are found in one query."""
+
+    def __init__(self, user):
+        DataLoader.__init__(self)
+        self.user = user
+    
+
+    def batch_load_fn(self, ids):
+        permissions = Collection.permissions(self.user, ids)
+        return Promise.resolve([
+            permissions.get(id, (False, False, False)) for id in ids
+        ])
+
+
+
+def get_permission_loader(info):
+    """Gets the collection permission loader for a request, creating it the
+    first time it's needed."""
+
+    if not hasattr(info.context, "permission_loader"):
+        info.context.permission_loader = CollectionPermissionLoader(info.context.user)
+    return info.context.permission_loader
+
+
+
 class UserType(DjangoObjectType):
     
     class Meta:
@@ -91,7 +121,7 @@ class GroupType(DjangoObjectType):
     
 
     def resolve_all_collections(self, info, **kwargs):
-        if info.context.user and self.users.filter(id=info.context.user.id):
+        if info.context.user and info.context.user.is_member_of(self.id):
             collections = self.collections.all()
             if "offset" in kwargs: collections = collections[kwargs["offset"]:]
             return collections
@@ -99,7 +129,7 @@ class GroupType(DjangoObjectType):
     
 
     def resolve_all_collections_count(self, info, **kwargs):
-        if info.context.user and self.users.filter(id=info.context.user.id):
+        if info.context.user and info.context.user.is_member_of(self.id):
             return self.collections.count()
         else: return 0
 
@@ -126,11 +156,11 @@ class CollectionType(DjangoObjectType):
     sample_count = graphene.Int()
 
     def resolve_can_edit(self, info, **kwargs):
-        return self.editable_by(info.context.user)
+        return get_permission_loader(info).load(self.id).then(lambda p: p[1])
     
 
     def resolve_can_execute(self, info, **kwargs):
-        return self.executable_by(info.context.user)
+        return get_permission_loader(info).load(self.id).then(lambda p: p[2])
 
 
     def resolve_papers(self, info, **kwargs):
@@ -19,9 +19,11 @@ class Query(graphene.ObjectType):
         token = info.context.COOKIES.get("refresh_token")
         if not token:
             raise GraphQLError(json.dumps({"token": "No refresh token supplied"}))
-        user = User.from_token(token)
+        user = User.from_refresh_token(token)
         if user:
-            info.context.refresh_token = user.make_refresh_jwt()
+            if user.refresh_claims["expires"] - time.time() < REFRESH_TOKEN_RENEWAL:
+                Session.revoke_token(token)
+                info.context.refresh_token = user.make_refresh_jwt()
             return user.make_access_jwt()
         raise GraphQLError(json.dumps({"token": "Refresh token not valid"}))
 
@@ -54,8 +56,9 @@ class Query(graphene.ObjectType):
         if info.context.user:
             collections = collections | Collection.objects.filter(owner=info.context.user)
             collections = collections | info.context.user.collections.all()
-            for group in info.context.user.groups.all():
-                collections = collections | group.collections.all()
+            collections = collections | Collection.objects.filter(
+                groups__id__in=info.context.user.group_ids()
+            )
         collection = collections.filter(id=kwargs["id"]).first()
         if collection: return collection
         raise GraphQLError('{"collection": "Does not exist"}')
@@ -76,8 +79,9 @@ class Query(graphene.ObjectType):
         if info.context.user:
             collections = collections | Collection.objects.filter(owner=info.context.user)
             collections = collections | info.context.user.collections.all()
-            for group in info.context.user.groups.all():
-                collections = collections | group.collections.all()
+            collections = collections | Collection.objects.filter(
+                groups__id__in=info.context.user.group_ids()
+            )
         sample = Sample.objects.filter(
             id=kwargs["id"], collection__in=collections
         ).first()
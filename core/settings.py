@@ -32,6 +32,24 @@ AUTH_PASSWORD_VALIDATORS = [{
     "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
 }]
 
+PASSWORD_HASHERS = [
+    "core.hashing.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+PASSWORD_ITERATIONS = 150000
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_LIMIT = 8
+PASSWORD_HASHING_TIMEOUT = 5
+
+THROTTLES = {
+    "login": {"ip": (30, 300), "username": (10, 300)},
+    "signup": {"ip": (20, 3600), "email": (10, 3600)},
+    "requestPasswordReset": {"ip": (10, 3600), "email": (3, 3600)},
+}
+THROTTLE_PROXIES = 0
+
 STATIC_URL = "/static/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "uploads") if DEBUG else\
@@ -40,10 +58,18 @@ MEDIA_URL = "/media/"
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ["X-Matrix-Shape", "X-Peka-Version"]
 
 ID_DIGITS_LENGTH = 18
 
 GRAPHENE = {"SCHEMA": "core.schema.schema"}
 
+PEKA_DATA = os.path.join(BASE_DIR, "peka", "data")
+PEKA_TILES = os.path.join(BASE_DIR, "peka", "tiles")
+PEKA_TILES_SIZE = 2 ** 30
+PEKA_SOURCES_INTERVAL = 10
+PEKA_PINNED_VERSIONS = 2
+PEKA_SWAP_RETRY = 60
+
 
 
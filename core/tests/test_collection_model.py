@@ -161,4 +161,48 @@ class CollectionExecutableTests(TestCase):
         CollectionGroupLink.objects.create(group=group, collection=collection, can_execute=True, can_edit=False)
         CollectionGroupLink.objects.create(group=other_group, collection=collection, can_execute=False, can_edit=False)
         self.assertTrue(collection.executable_by(user))
-        self.assertFalse(collection.executable_by(other))
\ No newline at end of file
+        self.assertFalse(collection.executable_by(other))
+
+
+class CollectionPermissionsTests(TestCase):
+
+    def test_permissions_of_many_collections(self):
+        user = mixer.blend(User)
+        group = mixer.blend(Group)
+        group.users.add(user)
+        owned = mixer.blend(Collection, owner=user)
+        public = mixer.blend(Collection, private=False)
+        private = mixer.blend(Collection, private=True)
+        linked = mixer.blend(Collection, private=True)
+        grouped = mixer.blend(Collection, private=True)
+        CollectionUserLink.objects.create(user=user, collection=linked, can_edit=False, can_execute=True)
+        CollectionGroupLink.objects.create(group=group, collection=grouped, can_edit=False, can_execute=False)
+        CollectionGroupLink.objects.create(group=mixer.blend(Group), collection=private, can_edit=True, can_execute=True)
+        ids = [owned.id, public.id, private.id, linked.id, grouped.id, 1]
+        with self.assertNumQueries(1):
+            permissions = Collection.permissions(user, ids)
+        self.assertEqual(permissions, {
+            owned.id: (True, True, True), public.id: (True, False, False),
+            private.id: (False, False, False), linked.id: (True, False, True),
+            grouped.id: (True, False, False)
+        })
+        with self.assertNumQueries(1):
+            permissions = Collection.permissions(None, ids)
+        self.assertEqual(permissions, {
+            owned.id: (False, False, False), public.id: (True, False, False),
+            private.id: (False, False, False), linked.id: (False, False, False),
+            grouped.id: (False, False, False)
+        })
+    
+
+    def test_any_group_can_give_permission(self):
+        user = mixer.blend(User)
+        group1, group2 = mixer.blend(Group), mixer.blend(Group)
+        group1.users.add(user)
+        group2.users.add(user)
+        collection = mixer.blend(Collection)
+        CollectionGroupLink.objects.create(group=group1, collection=collection, can_edit=False, can_execute=True)
+        CollectionGroupLink.objects.create(group=group2, collection=collection, can_edit=True, can_execute=False)
+        self.assertEqual(
+            Collection.permissions(user, [collection.id])[collection.id], (True, True, True)
+        )
@@ -0,0 +1,114 @@
+import os
+import json
+import threading
+from unittest.mock import patch
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.auth import hashers
+from concurrent.futures.process import BrokenProcessPool
+from core.hashing import *
+
+class HashingServiceTests(TestCase):
+
+    def test_can_hash_in_process(self):
+        service = HashingService(0, 2, 1)
+        encoded = service.run(encode_password, "sw0rdfish123")
+        self.assertTrue(hashers.check_password("sw0rdfish123", encoded))
+        self.assertEqual(service.stats["completed"], 1)
+        self.assertEqual(service.stats["in_service"], 0)
+        self.assertEqual(service.stats["peak_in_service"], 1)
+        self.assertIsNone(service.pool)
+    
+
+    def test_can_hash_in_workers(self):
+        service = HashingService(1, 2, 1)
+        try:
+            encoded = service.run(encode_password, "sw0rdfish123")
+            self.assertEqual(
+                service.run(verify_password, "sw0rdfish123", encoded), (True, None)
+            )
+            self.assertEqual(
+                service.run(verify_password, "wrong", encoded), (False, None)
+            )
+            self.assertIsNotNone(service.pool)
+            self.assertEqual(service.stats["completed"], 3)
+        finally:
+            service.pool.shutdown()
+    
+
+    def test_broken_pool_replaced(self):
+        service = HashingService(1, 2, 1)
+        try:
+            with self.assertRaises(BrokenProcessPool):
+                service.run(os._exit, 1)
+            self.assertEqual(service.stats["broken_pools"], 2)
+            self.assertEqual(service.run(len, "abc"), 3)
+            self.assertEqual(service.stats["in_service"], 0)
+        finally:
+            service.pool.shutdown()
+    
+
+    def test_busy_service_rejects_work(self):
+        service = HashingService(0, 1, 0)
+        started, release = threading.Event(), threading.Event()
+        def slow():
+            started.set()
+            release.wait(5)
+        thread = threading.Thread(target=service.run, args=[slow])
+        thread.start()
+        started.wait(5)
+        with self.assertRaises(HashingBusy) as context:
+            service.run(encode_password, "sw0rdfish123")
+        release.set()
+        thread.join()
+        self.assertEqual(
+            json.loads(str(context.exception)), {"error": "Server busy, try again shortly"}
+        )
+        self.assertEqual(service.stats["rejected"], 1)
+        self.assertEqual(service.stats["completed"], 1)
+        service.run(encode_password, "sw0rdfish123")
+        self.assertEqual(service.stats["completed"], 2)
+    
+
+    def test_failures_release_places(self):
+        service = HashingService(0, 1, 0)
+        with self.assertRaises(ZeroDivisionError):
+            service.run(lambda: 1 / 0)
+        service.run(encode_password, "sw0rdfish123")
+        self.assertEqual(service.stats["in_service"], 0)
+
+
+
+class PasswordHashingTests(TestCase):
+
+    def setUp(self):
+        self.patch = patch("core.hashing._service", HashingService(0, 2, 1))
+        self.patch.start()
+    
+
+    def tearDown(self):
+        self.patch.stop()
+
+
+    @override_settings(PASSWORD_ITERATIONS=1000)
+    def test_iterations_configurable(self):
+        encoded = make_password("sw0rdfish123")
+        algorithm, iterations, salt, hash_ = encoded.split("$")
+        self.assertEqual(int(iterations), 1000)
+    
+
+    def test_current_hashes_not_upgraded(self):
+        encoded = make_password("sw0rdfish123")
+        self.assertEqual(check_password("sw0rdfish123", encoded), (True, None))
+        self.assertEqual(check_password("wrong", encoded), (False, None))
+    
+
+    def test_outdated_hashes_upgraded(self):
+        with override_settings(PASSWORD_ITERATIONS=1000):
+            encoded = make_password("sw0rdfish123")
+        valid, new = check_password("sw0rdfish123", encoded)
+        self.assertTrue(valid)
+        algorithm, iterations, salt, hash_ = new.split("$")
+        self.assertEqual(int(iterations), 150000)
+        self.assertTrue(hashers.check_password("sw0rdfish123", new))
+        self.assertEqual(check_password("wrong", encoded), (False, None))
@@ -1,6 +1,6 @@
 from unittest.mock import patch, Mock, PropertyMock, MagicMock
 from mixer.backend.django import mixer
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 from django.conf import settings
 from core.middleware import *
 
@@ -17,8 +17,30 @@ class ApiAuthMiddlewareTests(TestCase):
     def test_middleware_uses_access_token_to_assign_user(self, from_token):
         self.request.META = {"HTTP_AUTHORIZATION": "Bearer 12345"}
         response = self.mw(self.request)
+        self.assertEqual(self.request.user.username, from_token.return_value.username)
         from_token.assert_called_with("12345")
-        self.request.user = from_token.return_value
+    
+
+    @patch("core.middleware.User.from_token")
+    def test_middleware_only_looks_up_user_when_used(self, from_token):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION="Bearer 12345")
+        skipped = AuthenticationMiddleware.stats["skipped_authentication"]
+        response = self.mw(request)
+        self.assertFalse(from_token.called)
+        self.assertEqual(AuthenticationMiddleware.stats["skipped_authentication"], skipped + 1)
+        self.callback.side_effect = lambda request: bool(request.user) and MagicMock()
+        response = self.mw(request)
+        self.assertTrue(from_token.called)
+        self.assertEqual(AuthenticationMiddleware.stats["skipped_authentication"], skipped + 1)
+    
+
+    @patch("core.middleware.User.from_token")
+    def test_missing_user_is_falsy(self, from_token):
+        from_token.return_value = None
+        self.request.META = {}
+        response = self.mw(self.request)
+        self.assertFalse(self.request.user)
+        from_token.assert_called_with("")
 
 
     def test_middleware_does_not_set_cookie_if_no_refresh_token_added(self):
@@ -36,4 +58,11 @@ class ApiAuthMiddlewareTests(TestCase):
     def test_middleware_deletes_cookie_if_refresh_token_false(self):
         self.request.refresh_token = False
         response = self.mw(self.request)
-        response.delete_cookie.assert_called_with("refresh_token")
\ No newline at end of file
+        response.delete_cookie.assert_called_with("refresh_token")
+    
+
+    def test_stats_are_served(self):
+        response = self.client.get("/status")
+        self.assertGreaterEqual(response.json()["authentication"]["skipped_authentication"], 1)
+        self.assertIn("hits", response.json()["token_cache"])
+        self.assertIn("misses", response.json()["user_cache"])
@@ -0,0 +1,59 @@
+import json
+from mixer.backend.django import mixer
+from django.test import TestCase, Client
+from core.models import User, Group, Collection, CollectionUserLink, CollectionGroupLink
+from core.tokens import tokens, users
+
+class CollectionPermissionQueryTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.group = mixer.blend(Group)
+        self.group.users.add(self.user)
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {self.user.make_access_jwt()}")
+        tokens.clear()
+        users.clear()
+    
+
+    def create_collections(self, count):
+        for n in range(count):
+            if n % 3 == 0:
+                mixer.blend(Collection, owner=self.user)
+            elif n % 3 == 1:
+                collection = mixer.blend(Collection)
+                CollectionUserLink.objects.create(
+                    user=self.user, collection=collection, can_edit=n % 2 == 0
+                )
+            else:
+                collection = mixer.blend(Collection)
+                CollectionUserLink.objects.create(
+                    user=self.user, collection=collection, can_edit=False
+                )
+                CollectionGroupLink.objects.create(
+                    group=self.group, collection=collection, can_execute=True
+                )
+    
+
+    def query(self, query):
+        response = self.client.post(
+            "/graphql", json.dumps({"query": query}), content_type="application/json"
+        )
+        return json.loads(response.content)["data"]
+    
+
+    def test_collection_permissions_constant_queries(self):
+        query = "{ user { allCollections { id canEdit canExecute } } }"
+        self.create_collections(10)
+        with self.assertNumQueries(4):
+            small = self.query(query)["user"]["allCollections"]
+        self.create_collections(90)
+        tokens.clear()
+        users.clear()
+        with self.assertNumQueries(4):
+            large = self.query(query)["user"]["allCollections"]
+        self.assertEqual(len(small), 10)
+        self.assertEqual(len(large), 100)
+        for result in large:
+            collection = Collection.objects.get(id=result["id"])
+            self.assertEqual(result["canEdit"], collection.editable_by(self.user))
+            self.assertEqual(result["canExecute"], collection.executable_by(self.user))
@@ -0,0 +1,121 @@
+import json
+import time
+from unittest.mock import patch
+from django.test import TestCase, RequestFactory
+from django.test.utils import override_settings
+from core.models import ThrottledAttempt
+from core.throttle import *
+
+@override_settings(THROTTLES={"login": {"ip": (3, 60), "username": (2, 60)}})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().post("/graphql", REMOTE_ADDR="1.2.3.4")
+        self.other = RequestFactory().post("/graphql", REMOTE_ADDR="5.6.7.8")
+    
+
+    def test_attempts_limited_per_key(self):
+        throttle("login", self.request, username="jack")
+        throttle("login", self.request, username="Jack")
+        with self.assertRaises(Throttled):
+            throttle("login", self.other, username="jack")
+        throttle("login", self.request, username="kate")
+        with self.assertRaises(Throttled) as context:
+            throttle("login", self.request, username="sawyer")
+        self.assertEqual(json.loads(str(context.exception)), {
+            "error": f"Too many attempts, try again in {context.exception.retry_after} seconds"
+        })
+        self.assertLessEqual(context.exception.retry_after, 60)
+        throttle("login", self.other, username="sawyer")
+    
+
+    def test_window_slides(self):
+        with patch("time.time", return_value=1000):
+            throttle("login", self.request, username="jack")
+        with patch("time.time", return_value=1030):
+            throttle("login", self.request, username="jack")
+            with self.assertRaises(Throttled) as context:
+                throttle("login", self.request, username="jack")
+            self.assertEqual(context.exception.retry_after, 30)
+        with patch("time.time", return_value=1061):
+            throttle("login", self.request, username="jack")
+            with self.assertRaises(Throttled):
+                throttle("login", self.request, username="jack")
+    
+
+    def test_rejected_attempts_not_recorded(self):
+        with patch("time.time", return_value=1000):
+            throttle("login", self.request, username="jack")
+            throttle("login", self.request, username="jack")
+        for t in range(1001, 1060, 10):
+            with patch("time.time", return_value=t):
+                with self.assertRaises(Throttled):
+                    throttle("login", self.request, username="jack")
+        with patch("time.time", return_value=1061):
+            throttle("login", self.request, username="jack")
+    
+
+    def test_unlimited_actions_and_keys(self):
+        for _ in range(5):
+            throttle("signup", self.request, email="jack@gmail.com")
+        for _ in range(3):
+            throttle("login", self.request, email="jack@gmail.com")
+        with self.assertRaises(Throttled):
+            throttle("login", self.request, email="kate@gmail.com")
+    
+
+    def test_client_ip(self):
+        request = RequestFactory().post(
+            "/graphql", REMOTE_ADDR="10.0.0.1",
+            HTTP_X_FORWARDED_FOR="1.1.1.1, 2.2.2.2,3.3.3.3"
+        )
+        self.assertEqual(client_ip(request), "10.0.0.1")
+        with override_settings(THROTTLE_PROXIES=1):
+            self.assertEqual(client_ip(request), "3.3.3.3")
+            self.assertEqual(client_ip(self.request), "1.2.3.4")
+        with override_settings(THROTTLE_PROXIES=2):
+            self.assertEqual(client_ip(request), "2.2.2.2")
+        with override_settings(THROTTLE_PROXIES=4):
+            self.assertEqual(client_ip(request), "10.0.0.1")
+    
+
+    @override_settings(THROTTLE_PROXIES=1)
+    def test_clients_behind_proxy_throttled_separately(self):
+        requests = [RequestFactory().post(
+            "/graphql", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=ip
+        ) for ip in ["1.1.1.1", "2.2.2.2"]]
+        for _ in range(3):
+            throttle("login", requests[0])
+        with self.assertRaises(Throttled):
+            throttle("login", requests[0])
+        throttle("login", requests[1])
+    
+
+    def test_attempts_held_in_database(self):
+        throttle("login", self.request, username="jack")
+        self.assertEqual(ThrottledAttempt.objects.count(), 2)
+        with self.assertRaises(Throttled):
+            for _ in range(2): throttle("login", self.request, username="jack")
+        self.assertEqual(ThrottledAttempt.objects.count(), 4)
+        ThrottledAttempt.objects.all().delete()
+        throttle("login", self.request, username="jack")
+    
+
+    def test_concurrent_attempts_counted(self):
+        now = time.time()
+        ThrottledAttempt.objects.create(key=throttle_key("login", "username", "jack"), time=now)
+        ThrottledAttempt.objects.create(key=throttle_key("login", "username", "jack"), time=now + 1)
+        with patch("time.time", return_value=now):
+            with self.assertRaises(Throttled) as context:
+                throttle("login", self.request, username="jack")
+        self.assertEqual(context.exception.retry_after, 60)
+        self.assertEqual(ThrottledAttempt.objects.count(), 2)
+    
+
+    def test_old_attempts_removed(self):
+        with patch("time.time", return_value=1000):
+            throttle("login", self.request, username="jack")
+        with patch("time.time", return_value=1061):
+            throttle("login", self.other, username="kate")
+        self.assertEqual(ThrottledAttempt.objects.count(), 2)
+        self.assertFalse(ThrottledAttempt.objects.filter(time=1000).exists())
@@ -0,0 +1,53 @@
+import time
+from unittest.mock import patch
+from django.test import TestCase
+from core.tokens import *
+
+class ExpiringCacheTests(TestCase):
+
+    def test_values_kept_until_expiry(self):
+        cache = ExpiringCache(10)
+        cache.set("a", 1, time.time() + 100)
+        cache.set("b", 2, time.time() - 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.stats(), {"size": 1, "hits": 1, "misses": 2})
+    
+
+    def test_least_recently_used_dropped(self):
+        cache = ExpiringCache(2)
+        cache.set("a", 1, time.time() + 100)
+        cache.set("b", 2, time.time() + 100)
+        cache.get("a")
+        cache.set("c", 3, time.time() + 100)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+    
+
+    def test_values_can_be_removed(self):
+        cache = ExpiringCache(2)
+        cache.set("a", 1, time.time() + 100)
+        cache.pop("a")
+        cache.pop("b")
+        self.assertIsNone(cache.get("a"))
+
+
+
+class TokenVerificationTests(TestCase):
+
+    def test_token_cached_until_it_expires(self):
+        token = jwt.encode({
+            "sub": 1, "expires": time.time() + 100
+        }, settings.SECRET_KEY, algorithm="HS256").decode()
+        self.assertEqual(verify_token(token)["sub"], 1)
+        self.assertEqual(tokens.values[token][1], jwt.decode(token, settings.SECRET_KEY)["expires"])
+        with patch("time.time", return_value=time.time() + 200):
+            with self.assertRaises(AssertionError):
+                verify_token(token)
+    
+
+    def test_invalid_tokens_not_cached(self):
+        with self.assertRaises(Exception):
+            verify_token("abc")
+        self.assertNotIn("abc", tokens.values)
@@ -1,3 +1,4 @@
+from unittest.mock import patch
 import jwt
 import time
 import os
@@ -7,7 +8,10 @@ from django.db.utils import IntegrityError
 from django.db import transaction
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
-from core.models import User, Collection
+from core.models import User, Group, Collection, Session
+from core.forms import UpdateUserForm, UpdatePasswordForm
+from core.hashing import make_password
+from core.tokens import revoked
 
 class UserCreationTests(TestCase):
 
@@ -112,6 +116,9 @@ class UserTokenTests(TestCase):
         self.assertEqual(token["sub"], user.id)
         self.assertLessEqual(time.time() - token["iat"], 2)
         self.assertLessEqual(time.time() - token["expires"] - 31536000, 2)
+        session = Session.objects.get(jti=token["jti"])
+        self.assertEqual(session.user, user)
+        self.assertEqual(session.issued, token["iat"])
 
 
 
@@ -150,6 +157,218 @@ class UserFromTokenTests(TestCase):
         self.assertEqual(User.from_token(token), self.user)
 
 
+    
+
+    def test_verified_tokens_cached(self):
+        token = self.user.make_access_jwt()
+        self.assertEqual(User.from_token(token), self.user)
+        with patch("core.tokens.jwt.decode") as decode:
+            self.assertEqual(User.from_token(token), self.user)
+            self.assertFalse(decode.called)
+    
+
+    def test_users_cached_until_changed(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        with self.assertNumQueries(0):
+            user = User.from_token(token)
+        self.assertEqual(user.name, self.user.name)
+        self.assertIsNot(User.from_token(token), user)
+        self.user.name = "New name"
+        self.user.save()
+        self.assertEqual(User.from_token(token).name, "New name")
+        self.user.delete()
+        self.assertIsNone(User.from_token(token))
+    
+
+    def test_cached_user_can_be_saved(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        user = User.from_token(token)
+        user.name = "New name"
+        user.save()
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(User.objects.get(id=self.user.id).name, "New name")
+    
+
+    def test_cached_user_save_keeps_changes_made_elsewhere(self):
+        User.cached(self.user.id)
+        user = User.cached(self.user.id)
+        User.objects.filter(id=self.user.id).update(
+            password="new", last_login=100, password_reset_token="abc"
+        )
+        form = UpdateUserForm({
+            "username": "locke", "name": "John Locke", "email": "J@l.com"
+        }, instance=user)
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, "new")
+        self.assertEqual(self.user.last_login, 100)
+        self.assertEqual(self.user.password_reset_token, "abc")
+        self.assertEqual(self.user.username, "locke")
+        self.assertEqual(self.user.email, "j@l.com")
+    
+
+    def test_cached_user_reads_credentials_from_database(self):
+        User.cached(self.user.id)
+        self.user.password = make_password("sw0rdfish123")
+        self.user.email = "new@l.com"
+        User.objects.filter(id=self.user.id).update(
+            password=self.user.password, email=self.user.email
+        )
+        user = User.cached(self.user.id)
+        self.assertEqual(user.email, "new@l.com")
+        form = UpdatePasswordForm({
+            "current": "old", "new": "sw0rdfish456"
+        }, instance=user)
+        self.assertFalse(form.is_valid())
+        form = UpdatePasswordForm({
+            "current": "sw0rdfish123", "new": "sw0rdfish456"
+        }, instance=user)
+        self.assertTrue(form.is_valid())
+    
+
+    def test_unchanged_cached_user_not_written(self):
+        User.cached(self.user.id)
+        user = User.cached(self.user.id)
+        user.name = user.name
+        with self.assertNumQueries(0):
+            user.save()
+
+
+class UserRefreshTokenTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        revoked.clear()
+
+
+    def test_valid_refresh_token_returns_user(self):
+        token = self.user.make_refresh_jwt()
+        Session.objects.update(last_used=0)
+        User.cached(self.user.id)
+        with self.assertNumQueries(1):
+            user = User.from_refresh_token(token)
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.refresh_claims["sub"], self.user.id)
+        self.assertLess(time.time() - Session.objects.get().last_used, 2)
+    
+
+    def test_refresh_token_not_access_token(self):
+        token = self.user.make_refresh_jwt()
+        self.assertIsNone(User.from_token(token))
+        self.assertIsNone(User.from_refresh_token(self.user.make_access_jwt()))
+        self.assertIsNone(User.from_refresh_token("sdsfsfd"))
+    
+
+    def test_revoked_refresh_token_rejected_without_query(self):
+        token = self.user.make_refresh_jwt()
+        Session.objects.all().delete()
+        self.assertIsNone(User.from_refresh_token(token))
+        with self.assertNumQueries(0):
+            self.assertIsNone(User.from_refresh_token(token))
+    
+
+    def test_sessions_can_be_revoked(self):
+        token1 = self.user.make_refresh_jwt()
+        token2 = self.user.make_refresh_jwt()
+        Session.revoke_token(token1)
+        Session.revoke_token("sdsfsfd")
+        with self.assertNumQueries(0):
+            self.assertIsNone(User.from_refresh_token(token1))
+        self.assertEqual(User.from_refresh_token(token2), self.user)
+    
+
+    def test_password_change_revokes_sessions(self):
+        token = self.user.make_refresh_jwt()
+        self.user.set_password("sw0rdfish123")
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertIsNone(User.from_refresh_token(token))
+    
+
+    def test_expired_sessions_removed(self):
+        with patch("time.time", return_value=time.time() - 31536000 - 10):
+            self.user.make_refresh_jwt()
+        self.user.make_refresh_jwt()
+        self.assertEqual(Session.objects.count(), 1)
+
+
+
+class UserMembershipTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.group1 = mixer.blend(Group)
+        self.group2 = mixer.blend(Group)
+        self.group1.users.add(self.user)
+        self.group2.users.add(self.user)
+        self.group2.admins.add(self.user)
+        self.user.refresh_from_db()
+
+
+    def test_access_token_has_memberships(self):
+        token = jwt.decode(self.user.make_access_jwt(), settings.SECRET_KEY)
+        self.assertEqual(token["memberships"]["version"], self.user.membership_version)
+        self.assertEqual(set(token["memberships"]["groups"]), {self.group1.id, self.group2.id})
+        self.assertEqual(token["memberships"]["admin_groups"], [self.group2.id])
+        token = jwt.decode(self.user.make_access_jwt(memberships=False), settings.SECRET_KEY)
+        self.assertNotIn("memberships", token)
+    
+
+    def test_memberships_answered_from_token(self):
+        user = User.from_token(self.user.make_access_jwt())
+        with self.assertNumQueries(1):
+            self.assertTrue(user.is_member_of(self.group1.id))
+            self.assertTrue(user.is_admin_of(str(self.group2.id)))
+            self.assertFalse(user.is_admin_of(self.group1.id))
+            self.assertFalse(user.is_admin_of("abc"))
+    
+
+    def test_stale_memberships_not_used(self):
+        token = self.user.make_access_jwt()
+        self.group1.admins.add(self.user)
+        user = User.from_token(token)
+        self.assertTrue(user.is_admin_of(self.group1.id))
+        self.assertFalse(hasattr(user, "memberships"))
+    
+
+    def test_memberships_checked_against_database(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        User.objects.filter(id=self.user.id).update(membership_version=100)
+        self.group2.admins.through.objects.filter(user=self.user).delete()
+        user = User.from_token(token)
+        self.assertEqual(user.membership_version, self.user.membership_version)
+        self.assertFalse(user.is_admin_of(self.group2.id))
+        self.assertFalse(user.is_admin_of(self.group2.id))
+    
+
+    def test_membership_changes_change_version(self):
+        version = User.objects.get(id=self.user.id).membership_version
+        for change in [
+            lambda: self.group1.users.remove(self.user),
+            lambda: self.user.groups.add(self.group1),
+            lambda: self.user.admin_groups.clear(),
+            lambda: self.group1.users.clear(),
+            lambda: self.group2.delete()
+        ]:
+            change()
+            new_version = User.objects.get(id=self.user.id).membership_version
+            self.assertGreater(new_version, version)
+            version = new_version
+    
+
+    def test_saving_user_keeps_membership_version(self):
+        user = User.objects.get(id=self.user.id)
+        self.group1.admins.add(self.user)
+        user.name = "New name"
+        user.save()
+        user = User.objects.get(id=self.user.id)
+        self.assertEqual(user.name, "New name")
+        self.assertEqual(user.membership_version, self.user.membership_version + 1)
+
+
 
 class UserCollectionsTests(TestCase):
     
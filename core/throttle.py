@@ -0,0 +1,85 @@
+import json
+import math
+import time
+import hashlib
+from collections import Counter
+from django.conf import settings
+from core.models import ThrottledAttempt
+
+stats = Counter()
+
+class Throttled(Exception):
+    """Raised when an action has been attempted too often recently. Its
+    message is a JSON error, so it is passed on to GraphQL clients."""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        Exception.__init__(self, json.dumps({
+            "error": f"Too many attempts, try again in {retry_after} seconds"
+        }))
+
+
+
+def throttle_key(action, kind, value):
+    """Creates the key under which attempts at an action by some IP, username
+    or email are recorded."""
+
+    value = hashlib.sha1(str(value).strip().lower().encode()).hexdigest()
+    return f"throttle:{action}:{kind}:{value}"
+
+
+def client_ip(request):
+    """The IP address a request was made from. If the THROTTLE_PROXIES setting
+    says requests come through some number of trusted reverse proxies, each
+    of which appends the address it was connected to from to the
+    X-Forwarded-For header, the address the outermost of them saw is used.
+    Anything before it in the header is the client's own claim, and isn't
+    trusted."""
+
+    proxies = settings.THROTTLE_PROXIES
+    if proxies:
+        forwarded = [
+            ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if ip.strip()
+        ]
+        if len(forwarded) >= proxies: return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR")
+
+
+def throttle(action, request, **values):
+    """Records an attempt at an action, made by the request's IP address and
+    for the usernames or emails given as keyword arguments.
+
+    Each of these has a sliding window limit in the THROTTLES setting - at
+    most some number of attempts in the last so many seconds. If any is
+    already at its limit, Throttled is raised and the attempt isn't
+    recorded, so that a client which keeps trying is let back in once its
+    earlier attempts have aged out.
+
+    Attempts are rows in the database, so that every worker process shares
+    them. Each attempt is saved before the others in its window are counted,
+    and removed again if there are too many - so of any attempts made at the
+    same time, the last to count sees all the rest, and between them they can
+    never exceed the limit. At worst they are all turned away."""
+
+    limits = settings.THROTTLES.get(action, {})
+    values = {"ip": client_ip(request), **values}
+    windows = {
+        throttle_key(action, kind, value): limits[kind]
+        for kind, value in values.items() if value and kind in limits
+    }
+    if not windows: return
+    now = time.time()
+    longest = max(window for kinds in settings.THROTTLES.values()
+        for _, window in kinds.values())
+    ThrottledAttempt.objects.filter(time__lt=now - longest).delete()
+    attempts = [ThrottledAttempt.objects.create(key=key, time=now) for key in windows]
+    for attempt in attempts:
+        limit, window = windows[attempt.key]
+        times = list(ThrottledAttempt.objects.filter(
+            key=attempt.key, time__gt=now - window
+        ).exclude(id=attempt.id).order_by("-time").values_list("time", flat=True)[:limit])
+        if len(times) >= limit:
+            ThrottledAttempt.objects.filter(id__in=[a.id for a in attempts]).delete()
+            stats[action] += 1
+            raise Throttled(max(math.ceil(times[-1] + window - now), 1))
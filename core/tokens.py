@@ -0,0 +1,77 @@
+import jwt
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+class ExpiringCache:
+    """A store of at most some number of values, each of which is kept until
+    a given expiry time. When it's full, the least recently used value is
+    dropped. It counts how many lookups find a value and how many don't."""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, key):
+        """Returns the value for a key, or None if there isn't one or it has
+        expired."""
+
+        with self.lock:
+            entry = self.values.get(key)
+            if entry and entry[1] > time.time():
+                self.values.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry: del self.values[key]
+            self.misses += 1
+
+
+    def set(self, key, value, expires):
+        """Stores a value until the expiry time given."""
+
+        with self.lock:
+            self.values[key] = (value, expires)
+            self.values.move_to_end(key)
+            while len(self.values) > self.size:
+                self.values.popitem(last=False)
+
+
+    def pop(self, key):
+        """Removes a key's value, if it has one."""
+
+        with self.lock:
+            self.values.pop(key, None)
+
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+    def stats(self):
+        return {"size": len(self.values), "hits": self.hits, "misses": self.misses}
+
+
+
+tokens = ExpiringCache(4096)
+users = ExpiringCache(1024)
+revoked = ExpiringCache(4096)
+
+def verify_token(token):
+    """Takes a JWT, and if it's signed properly and isn't expired, returns its
+    claims. Otherwise an exception is raised.
+
+    Verified claims are cached until the token expires, so the same token
+    used for many requests is only checked once."""
+
+    claims = tokens.get(token)
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY)
+        assert claims["expires"] > time.time()
+        tokens.set(token, claims, claims["expires"])
+    return claims
@@ -5,6 +5,7 @@ from graphene_django.views import GraphQLView
 from django.conf.urls.static import static
 import django.conf
 from django.urls import path, include
+from .views import status
 
 class ReadableErrorGraphQLView(FileUploadGraphQLView):
     """A custom GraphQLView which stops Python error messages being sent to
@@ -22,6 +23,7 @@ class ReadableErrorGraphQLView(FileUploadGraphQLView):
 urlpatterns = [
     path("graphql", ReadableErrorGraphQLView.as_view()),
     path("peka/", include("peka.urls")),
+    path("status", status),
 ]
 if django.conf.settings.DEBUG:
     urlpatterns += static(
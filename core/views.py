@@ -0,0 +1,13 @@
+from django.http import JsonResponse
+from .middleware import AuthenticationMiddleware
+from .tokens import tokens, users
+from .hashing import get_service
+from . import throttle
+
+def status(request):
+    return JsonResponse({
+        "authentication": dict(AuthenticationMiddleware.stats),
+        "token_cache": tokens.stats(), "user_cache": users.stats(),
+        "password_hashing": dict(get_service().stats),
+        "throttled": dict(throttle.stats)
+    })
@@ -25,4 +25,7 @@ ssh $user@$host "~/$host/env/bin/pip install psycopg2-binary"
 ssh $user@$host "~/$host/env/bin/pip install -r ~/$host/source/requirements.txt"
 
 # Apply migrations
-ssh $user@$host "~/$host/env/bin/python ~/$host/source/manage.py migrate"
\ No newline at end of file
+ssh $user@$host "~/$host/env/bin/python ~/$host/source/manage.py migrate"
+
+# Pack PEKA data
+ssh $user@$host "~/$host/env/bin/python ~/$host/source/manage.py build_peka_bundle"
\ No newline at end of file
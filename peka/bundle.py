@@ -0,0 +1,338 @@
+import os
+import json
+import mmap
+import hashlib
+import time
+import struct
+import threading
+import numpy as np
+from django.conf import settings
+from .heatmaps import Heatmap
+from .store import load, read_json, current_version, version_directory
+
+MAGIC = b"PEKARBP\0"
+FORMAT_VERSION = 3
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 16
+
+_build_lock = threading.Lock()
+_lock = threading.Lock()
+_derived = {}
+_checks = {}
+_rebuilds = {}
+
+def bundle_path(directory):
+    """The location of the RBP bundle for a PEKA data directory."""
+
+    return os.path.join(directory, "rbp.bundle")
+
+
+def align(offset):
+    """Rounds an offset up to the next multiple of the bundle's alignment."""
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def source_signatures(directory):
+    """Identifies the current state of the RBP JSON files in a PEKA data
+    directory, as a mapping of RBP names to file modification times and
+    sizes."""
+
+    signatures = {}
+    for entry in os.scandir(os.path.join(directory, "rbp")):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            signatures[entry.name[:-5]] = [stat.st_mtime_ns, stat.st_size]
+    return signatures
+
+
+def read_sections(directory, name, palette):
+    """Reads an RBP's JSON file, and yields each of its heatmaps along with its
+    section's keys and other fields. Any colours used which aren't already in
+    the palette given are added to it."""
+
+    document = read_json(os.path.join(directory, "rbp", f"{name}.json"))
+    for key, section in document.items():
+        yield key, list(section), {
+            k: v for k, v in section.items() if k not in ["rows", "columns", "matrix"]
+        }, Heatmap.from_json(section, palette)
+
+
+def reuse_sections(bundle, name, palette, mapping):
+    """Yields an RBP's heatmaps from an existing bundle, in the same form as
+    read_sections, with their colours translated into the palette given.
+    The mapping array holds the new palette index of each colour in the old
+    bundle's palette, or -1 if it hasn't been added yet."""
+
+    for key, entry in bundle.rbps[name].items():
+        heatmap = bundle.heatmap(name, key)
+        for index in np.unique(heatmap.colors):
+            if mapping[index] < 0:
+                mapping[index] = len(palette)
+                palette.append(bundle.palette[index])
+        heatmap.colors = mapping[heatmap.colors]
+        yield key, entry["keys"], entry["fields"], heatmap
+
+
+def build_bundle(directory, previous=None):
+    """Packs every RBP JSON file in a PEKA data directory into a single binary
+    bundle, and returns its path.
+
+    The bundle starts with a short preamble giving the format version and the
+    length of a JSON header. The header holds everything other than the cell
+    data - a shared table of row labels, a table of the distinct column lists,
+    a palette of every colour used, and for each RBP the remaining fields of
+    its heatmaps, along with the modification time and size of each source
+    file. After the header come all cell values as one float64 array - the
+    same precision as the JSON, so values are served exactly as they were
+    written - and then all cell colours as one uint16 array of palette
+    indices.
+
+    If a previous bundle for the directory is given, the RBPs whose files
+    haven't changed since it was built are copied from it rather than parsed
+    again, so only the files which have changed are read.
+
+    The bundle is written to a temporary file first and then moved into
+    place, so that nothing ever reads a partially written bundle, and any
+    process which has the old bundle mapped keeps its copy intact."""
+
+    sources = source_signatures(directory)
+    names = sorted(sources)
+    labels, label_lookup, column_sets, palette = [], {}, [], []
+    values, colors, rbps, count = [], [], {}, 0
+    if previous is not None:
+        mapping = np.full(len(previous.palette), -1, dtype="<i4")
+    for name in names:
+        if previous is not None and previous.sources.get(name) == sources[name]:
+            sections = reuse_sections(previous, name, palette, mapping)
+        else:
+            sections = read_sections(directory, name, palette)
+        rbps[name] = {}
+        for key, keys, fields, heatmap in sections:
+            for label in heatmap.rows:
+                if label not in label_lookup:
+                    label_lookup[label] = len(labels)
+                    labels.append(label)
+            if heatmap.columns not in column_sets:
+                column_sets.append(heatmap.columns)
+            rbps[name][key] = {
+                "keys": keys, "fields": fields,
+                "rows": [label_lookup[label] for label in heatmap.rows],
+                "columns": column_sets.index(heatmap.columns),
+                "shape": list(heatmap.values.shape), "offset": count
+            }
+            values.append(heatmap.values.astype("<f8").ravel())
+            colors.append(heatmap.colors.astype("<u2").ravel())
+            count += heatmap.values.size
+    header = json.dumps({
+        "count": count, "labels": labels, "columns": column_sets,
+        "palette": palette, "rbps": rbps, "sources": sources
+    }, separators=(",", ":")).encode()
+    path = bundle_path(directory)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (align(f.tell()) - f.tell()))
+        for array in values: f.write(array.tobytes())
+        for array in colors: f.write(array.tobytes())
+    os.replace(temp_path, path)
+    return path
+
+
+
+class RbpBundle:
+    """The contents of an RBP bundle file. The file is memory-mapped rather
+    than read, so that every process using the same bundle shares one copy of
+    it in the OS page cache, and only the header needs parsing. The cell
+    values and colours are flat read-only arrays over the mapped bytes, and
+    an RBP's heatmaps are only assembled from them when asked for."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < PREAMBLE.size:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} RBP bundle")
+        magic, version, header_length = PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} RBP bundle")
+        header_bytes = buffer[PREAMBLE.size:PREAMBLE.size + header_length]
+        header = json.loads(header_bytes)
+        self.version = hashlib.sha1(header_bytes).hexdigest()[:12]
+        start = align(PREAMBLE.size + header_length)
+        count = header["count"]
+        self.values = np.frombuffer(buffer, "<f8", count, start)
+        self.colors = np.frombuffer(buffer, "<u2", count, start + count * 8)
+        self.labels = header["labels"]
+        self.column_sets = header["columns"]
+        self.palette = header["palette"]
+        self.rbps = header["rbps"]
+        self.sources = header["sources"]
+        self.buffer = buffer
+
+
+    def __contains__(self, name):
+        return name in self.rbps
+
+
+    @property
+    def names(self):
+        return list(self.rbps)
+
+
+    def heatmap(self, name, key):
+        """Returns one of an RBP's heatmaps."""
+
+        entry = self.rbps[name][key]
+        rows, columns = entry["shape"]
+        cells = slice(entry["offset"], entry["offset"] + rows * columns)
+        return Heatmap(
+            [self.labels[index] for index in entry["rows"]],
+            self.column_sets[entry["columns"]],
+            self.values[cells].reshape(rows, columns),
+            self.colors[cells].reshape(rows, columns),
+            self.palette, entry["fields"]
+        )
+
+
+    def field(self, name, key, field, values_only=False):
+        """Returns one field of one of an RBP's heatmaps, assembling only the
+        cells that field needs, if any."""
+
+        entry = self.rbps[name][key]
+        if field == "rows":
+            return [self.labels[index] for index in entry["rows"]]
+        if field == "columns":
+            return self.column_sets[entry["columns"]]
+        if field == "matrix":
+            return self.heatmap(name, key).matrix(values_only)
+        return entry["fields"][field]
+
+
+    def section(self, name, key, values_only=False):
+        """Returns one of an RBP's heatmaps in the same form as in its original
+        JSON file."""
+
+        return {
+            field: self.field(name, key, field, values_only)
+            for field in self.rbps[name][key]["keys"]
+        }
+
+
+    def document(self, name, values_only=False):
+        """Returns an RBP's data in the same form as its original JSON file,
+        or with only values in its matrices if requested."""
+
+        return {key: self.section(name, key, values_only) for key in self.rbps[name]}
+
+
+    def project(self, name, paths, values_only=False):
+        """Returns only the parts of an RBP's document picked out by some
+        dotted paths, such as 'rbp_heatmap.rows', without assembling any of
+        the others. A KeyError is raised if a path doesn't exist."""
+
+        document = {}
+        for path in paths:
+            keys = path.split(".")
+            if len(keys) == 1:
+                value = self.section(name, keys[0], values_only)
+            else:
+                value = self.field(name, keys[0], keys[1], values_only)
+                for key in keys[2:]:
+                    if not isinstance(value, dict): raise KeyError(key)
+                    value = value[key]
+            parent = document
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[keys[-1]] = value
+        return document
+
+
+
+def open_bundle(directory):
+    """Opens the RBP bundle for a PEKA data directory, after checking that it
+    was built from the RBP files currently there. If it wasn't, or there is no
+    usable bundle at all, it is rebuilt first - reusing whatever it can from
+    the existing bundle."""
+
+    path = bundle_path(directory)
+    with _build_lock:
+        bundle = None
+        try:
+            bundle = RbpBundle(path)
+            if bundle.sources == source_signatures(directory): return bundle
+        except (FileNotFoundError, ValueError): pass
+        build_bundle(directory, bundle)
+    return RbpBundle(path)
+
+
+def map_bundle(directory):
+    """Opens the RBP bundle for a PEKA data directory as it is. It is only
+    built first if there is no usable bundle at all."""
+
+    try:
+        return RbpBundle(bundle_path(directory))
+    except (FileNotFoundError, ValueError):
+        return open_bundle(directory)
+
+
+def rebuild(directory):
+    """Rebuilds the RBP bundle for a data directory in a background thread,
+    unless that is already happening."""
+
+    with _lock:
+        if directory in _rebuilds: return
+        _rebuilds[directory] = threading.Thread(
+            target=run_rebuild, args=(directory,), daemon=True
+        )
+        _rebuilds[directory].start()
+
+
+def run_rebuild(directory):
+    try:
+        open_bundle(directory)
+    finally:
+        with _lock:
+            del _rebuilds[directory]
+
+
+def get_bundle(directory=None):
+    """Returns the RBP bundle for a data directory - by default, that of the
+    current version - mapping it the first time it is needed and again
+    whenever the file changes.
+
+    The RBP files it was built from are checked when it is first used, and
+    then at most once every PEKA_SOURCES_INTERVAL seconds. If any have been
+    changed, added or removed, the bundle is rebuilt in the background, and
+    the old one is served until the new one is ready - so no request waits
+    for a rebuild, unless there is no bundle to serve at all."""
+
+    directory = directory or version_directory(current_version())
+    bundle = load(map_bundle, directory, paths=[bundle_path(directory)])
+    now = time.monotonic()
+    if now >= _checks.get(directory, 0):
+        _checks[directory] = now + settings.PEKA_SOURCES_INTERVAL
+        if bundle.sources != source_signatures(directory): rebuild(directory)
+    return bundle
+
+
+def from_bundle(build, directory=None):
+    """Returns an object built from the RBP bundle for a data directory - by
+    default, that of the current version. It is built by calling build with
+    the bundle and whatever was built from the previous bundle, if anything,
+    and is only built again when the bundle changes."""
+
+    directory = directory or version_directory(current_version())
+    bundle = get_bundle(directory)
+    value = _derived.get((build, directory))
+    if value is None or value.bundle is not bundle:
+        value = build(bundle, value)
+        _derived[(build, directory)] = value
+    return value
+
+
+def forget_derived(directory):
+    """Drops everything built from the RBP bundle for a data directory."""
+
+    for key in list(_derived):
+        if key[1] == directory: _derived.pop(key, None)
@@ -0,0 +1,68 @@
+from bisect import bisect_left
+from .bundle import from_bundle
+from .motifs import RbpMotifIndex
+
+TOP_MOTIFS = 5
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+class Catalogue:
+    """A summary of every RBP in a bundle - its name, cell line, protein, the
+    dimensions of each of its heatmaps and its highest scoring motifs - for
+    listing and searching RBPs without reading any of their matrices.
+
+    The RBPs are kept in name order. Every name and protein name is also kept
+    in a sorted list of lowercase keys, so that prefix searches are a binary
+    search rather than a scan."""
+
+    def __init__(self, bundle, previous=None):
+        self.bundle = bundle
+        self.entries = [self.summarise(bundle, name) for name in sorted(bundle.names)]
+        self.names = [entry["name"].lower() for entry in self.entries]
+        self.keys = sorted({
+            (key.lower(), index) for index, entry in enumerate(self.entries)
+            for key in [entry["name"], entry["protein"]]
+        })
+
+
+    @staticmethod
+    def summarise(bundle, name):
+        """Creates the catalogue entry for one RBP. Names are of the form
+        'cell line-protein'."""
+
+        cell_line, protein = name.split("-", 1) if "-" in name else [None, name]
+        entries = sorted(RbpMotifIndex.rbp_entries(bundle, name), key=lambda e: e[2])
+        return {
+            "name": name, "cell_line": cell_line, "protein": protein,
+            "heatmaps": {key: entry["shape"] for key, entry in bundle.rbps[name].items()},
+            "top_motifs": [motif for motif, _, _ in entries[:TOP_MOTIFS]]
+        }
+
+
+    def find(self, prefix=None, search=None, cell_line=None):
+        """Returns the entries for the RBPs whose name or protein name starts
+        with a prefix, whose name contains a search string, and which are from
+        a given cell line - ignoring case, and ignoring any of these which are
+        not given."""
+
+        if prefix:
+            prefix, indices = prefix.lower(), set()
+            for key, index in self.keys[bisect_left(self.keys, (prefix,)):]:
+                if not key.startswith(prefix): break
+                indices.add(index)
+            indices = sorted(indices)
+        else:
+            indices = range(len(self.entries))
+        search = search.lower() if search else None
+        return [self.entries[index] for index in indices
+            if (not search or search in self.names[index])
+            and (not cell_line or self.entries[index]["cell_line"] == cell_line)]
+
+
+
+def get_catalogue(directory=None):
+    """Returns the RBP catalogue for a data directory - by default, that of
+    the current version - building it the first time it is needed and again
+    whenever the RBP bundle changes."""
+
+    return from_bundle(Catalogue, directory)
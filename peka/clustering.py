@@ -0,0 +1,98 @@
+import hashlib
+import numpy as np
+from .neighbours import normalise
+from .store import LruCache
+
+METHODS = ["average", "complete"]
+CACHE_SIZE = 256
+
+_clusterings = LruCache(CACHE_SIZE)
+
+def distances(vectors, metric):
+    """Returns the distance between every pair of rows of a matrix, as one
+    minus their similarity under the metric given."""
+
+    vectors = normalise(vectors, metric)
+    return np.clip(1 - vectors @ vectors.T, 0, None)
+
+
+def linkage(distances, method):
+    """Clusters the items in a distance matrix hierarchically, merging the two
+    closest clusters at each step, where the distance between clusters is the
+    average ('average') or largest ('complete') distance between their items.
+
+    The result is a linkage matrix in the same form as SciPy's, and as used
+    in dendrogram.json - one row per merge, giving the two clusters merged,
+    the distance between them and the size of the new cluster. The original
+    items are clusters 0 to n - 1, and the cluster made at step i is n + i.
+
+    Each row's nearest neighbour is remembered between steps, so only the
+    rows affected by a merge need searching again, rather than the whole
+    matrix."""
+
+    n = len(distances)
+    d = np.array(distances, dtype=float)
+    np.fill_diagonal(d, np.inf)
+    ids, sizes = np.arange(n), np.ones(n)
+    nearest = d.argmin(axis=1) if n else np.array([], dtype=int)
+    nearest_distances = d[np.arange(n), nearest]
+    merges = np.zeros((max(n - 1, 0), 4))
+    for step in range(n - 1):
+        a = int(nearest_distances.argmin())
+        b = int(nearest[a])
+        merges[step] = [*sorted([ids[a], ids[b]]), d[a, b], sizes[a] + sizes[b]]
+        if method == "complete":
+            merged = np.maximum(d[a], d[b])
+        else:
+            merged = (sizes[a] * d[a] + sizes[b] * d[b]) / (sizes[a] + sizes[b])
+        merged[[a, b]] = np.inf
+        d[a], d[:, a] = merged, merged
+        d[b], d[:, b] = np.inf, np.inf
+        ids[a], sizes[a] = n + step, sizes[a] + sizes[b]
+        nearest_distances[b] = np.inf
+        closer = merged < nearest_distances
+        nearest[closer], nearest_distances[closer] = a, merged[closer]
+        for row in np.flatnonzero((nearest == a) | (nearest == b)).tolist() + [a]:
+            if row == b: continue
+            nearest[row] = d[row].argmin()
+            nearest_distances[row] = d[row, nearest[row]]
+    return merges
+
+
+def leaves(linkage_matrix, n):
+    """Returns the order the items of a linkage matrix appear in along the
+    bottom of its dendrogram, from left to right."""
+
+    order, stack = [], [2 * n - 2] if n else []
+    while stack:
+        node = stack.pop()
+        if node < n:
+            order.append(node)
+        else:
+            left, right = linkage_matrix[node - n][:2]
+            stack.extend([int(right), int(left)])
+    return order
+
+
+def dendrogram(labels, vectors, metric, method):
+    """Clusters some labelled vectors, returning the labels, the linkage matrix
+    and the labels in dendrogram order."""
+
+    matrix = linkage(distances(vectors, metric), method)
+    return {
+        "labels": labels, "linkage_matrix": matrix.tolist(),
+        "leaves": [labels[index] for index in leaves(matrix, len(labels))]
+    }
+
+
+def clustering_key(*parts):
+    """Creates a key identifying a clustering from everything it depends on."""
+
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def get_clustering(key, build):
+    """Returns the clustering with a given key, calling build to create it if
+    it isn't among the most recently used clusterings."""
+
+    return _clusterings.get(key, build)
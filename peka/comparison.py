@@ -0,0 +1,78 @@
+import numpy as np
+from .store import LruCache
+
+TOP_MOTIFS = 10
+CACHE_SIZE = 1024
+
+_comparisons = LruCache(CACHE_SIZE)
+
+def rank(values):
+    """Ranks some values from smallest to largest, starting at 1, giving tied
+    values the average of the ranks they span."""
+
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat((starts + ends + 1) / 2, ends - starts)
+    return ranks
+
+
+def spearman(a, b):
+    """The Spearman rank correlation of two equal length arrays, or None if
+    it's undefined because there are fewer than two values, or either array
+    has no variation."""
+
+    if len(a) < 2: return None
+    a, b = rank(a) - (len(a) + 1) / 2, rank(b) - (len(b) + 1) / 2
+    norm = np.sqrt((a @ a) * (b @ b))
+    return float(a @ b / norm) if norm else None
+
+
+def compare(index, a, b, top=TOP_MOTIFS):
+    """Compares the PEKA scores of two RBPs in an inverted motif index. Their
+    motifs are aligned by sequence, and for those they share, the scores and
+    ranks in each RBP are given along with how they change from the first
+    RBP to the second - largest changes first. The Spearman correlation of
+    the shared scores is given too, as are the shared motifs which are in
+    the top ranked motifs of both, and the motifs only one RBP has."""
+
+    motifs, scores, ranks = [], [], []
+    for name in [a, b]:
+        entries = index.entries[name]
+        motifs.append(np.array([entry[0] for entry in entries], dtype=str))
+        scores.append(np.array([entry[1] for entry in entries], dtype=float))
+        ranks.append(np.array([entry[2] for entry in entries], dtype=int))
+    shared, a_indices, b_indices = np.intersect1d(
+        motifs[0], motifs[1], assume_unique=True, return_indices=True
+    )
+    a_scores, b_scores = scores[0][a_indices], scores[1][b_indices]
+    a_ranks, b_ranks = ranks[0][a_indices], ranks[1][b_indices]
+    deltas = b_scores - a_scores
+    order = np.argsort(-np.abs(deltas), kind="stable")
+    return {
+        "rbps": [a, b], "correlation": spearman(a_scores, b_scores),
+        "shared_top": shared[(a_ranks <= top) & (b_ranks <= top)].tolist(),
+        "only": {
+            a: np.setdiff1d(motifs[0], shared, assume_unique=True).tolist(),
+            b: np.setdiff1d(motifs[1], shared, assume_unique=True).tolist()
+        }, "motifs": [{
+            "motif": motif, "scores": [score_a, score_b], "delta": delta,
+            "ranks": [rank_a, rank_b], "rank_change": rank_b - rank_a
+        } for motif, score_a, score_b, delta, rank_a, rank_b in zip(
+            shared[order].tolist(), a_scores[order].tolist(),
+            b_scores[order].tolist(), deltas[order].tolist(),
+            a_ranks[order].tolist(), b_ranks[order].tolist()
+        )]
+    }
+
+
+def get_comparison(index, a, b, top=TOP_MOTIFS):
+    """Returns the comparison of two RBPs in an inverted motif index, using
+    a recent comparison of the same pair if there is one."""
+
+    return _comparisons.get(
+        (index.bundle.version, a, b, top), lambda: compare(index, a, b, top)
+    )
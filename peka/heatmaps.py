@@ -0,0 +1,119 @@
+import numpy as np
+
+def select(labels, selector):
+    """Turns a selector string into a list of indices into some labels. The
+    selector is a comma-separated list of labels and index ranges, where a
+    range looks like 'start:stop' and either end can be omitted. A KeyError
+    is raised for unknown labels, and a ValueError for invalid ranges or if
+    any label is selected more than once - so a selection is never larger
+    than what it selects from."""
+
+    indices, lookup = [], None
+    for item in selector.split(","):
+        if ":" in item:
+            try:
+                start, stop = item.split(":")
+                selected = range(len(labels))[slice(
+                    int(start) if start else None, int(stop) if stop else None
+                )]
+            except ValueError: raise ValueError("Invalid range")
+            indices.extend(selected)
+        else:
+            if lookup is None:
+                lookup = {str(label): index for index, label in enumerate(labels)}
+            indices.append(lookup[item])
+    if len(set(indices)) != len(indices):
+        raise ValueError("Rows and columns can only be selected once")
+    return indices
+
+
+def json_values(values):
+    """Turns an array of values into nested lists which can be serialised as
+    JSON. Missing values are held as NaN, which JSON has no way of writing, so
+    they are given as None instead - as they were in the original files."""
+
+    missing = np.isnan(values)
+    if not missing.any(): return values.tolist()
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+
+
+class Heatmap:
+    """A matrix of values with labelled rows and columns, and a colour for
+    each cell. The values are held as a NumPy array, and the colours as an
+    array of indices into a palette of hex strings. Any other settings needed
+    to draw it, such as its colormap, are kept as a dictionary of fields."""
+
+    def __init__(self, rows, columns, values, colors, palette, fields=None):
+        self.rows = rows
+        self.columns = columns
+        self.values = values
+        self.colors = colors
+        self.palette = palette
+        self.fields = fields or {}
+
+
+    @staticmethod
+    def from_json(heatmap, palette):
+        """Creates a heatmap from the JSON representation PEKA uses, where each
+        cell is an object with a value and a colour. Any colours not already in
+        the palette given are added to it. Missing values are held as NaN."""
+
+        lookup = {color: index for index, color in enumerate(palette)}
+        for row in heatmap["matrix"]:
+            for cell in row:
+                if cell["color"] not in lookup:
+                    lookup[cell["color"]] = len(palette)
+                    palette.append(cell["color"])
+        return Heatmap(
+            heatmap["rows"], heatmap["columns"],
+            np.array([[cell["value"] for cell in row] for row in heatmap["matrix"]], dtype=float),
+            np.array([[lookup[cell["color"]] for cell in row] for row in heatmap["matrix"]]),
+            palette, {
+                key: value for key, value in heatmap.items()
+                if key not in ["rows", "columns", "matrix"]
+            }
+        )
+
+
+    def select(self, rows=None, columns=None):
+        """Returns a new heatmap containing just some of this one's rows and
+        columns, given as selector strings. If either is omitted, all rows or
+        columns are kept."""
+
+        row_indices = select(self.rows, rows) if rows else range(len(self.rows))
+        column_indices = select(self.columns, columns) if columns else range(len(self.columns))
+        cells = np.ix_(row_indices, column_indices)
+        return Heatmap(
+            [self.rows[index] for index in row_indices],
+            [self.columns[index] for index in column_indices],
+            self.values[cells], self.colors[cells], self.palette, self.fields
+        )
+
+
+    def matrix(self, values_only=False):
+        """Returns the cells in the JSON representation PEKA uses - a list of
+        rows, each a list of objects with a value and a colour.
+
+        Alternatively, the values alone can be returned as one flat row-major
+        list along with the matrix's shape, leaving clients to derive colours
+        from the colormap - this is around half the size."""
+
+        if values_only:
+            return {"shape": list(self.values.shape), "values": json_values(self.values.ravel())}
+        palette = self.palette
+        return [[
+            {"color": palette[color], "value": value}
+            for color, value in zip(color_row, value_row)
+        ] for color_row, value_row in zip(self.colors.tolist(), json_values(self.values))]
+
+
+    def to_json(self, values_only=False):
+        """Returns the heatmap in the JSON representation PEKA uses."""
+
+        return {
+            **self.fields, "rows": self.rows,
+            "columns": self.columns, "matrix": self.matrix(values_only)
+        }
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from peka.store import current_version, version_directory
+
+CASES = [
+    ["data", "/peka/"],
+    ["data_values", "/peka/?format=values"],
+    ["entities", "/peka/entities/"],
+    ["rbp", "/peka/rbp?name={rbp}"],
+    ["rbp_values", "/peka/rbp?name={rbp}&format=values"],
+    ["motif", "/peka/motif?sequence={motif}"],
+]
+
+_counting = [False, 0]
+_hooked = []
+
+def count_opens(event, args):
+    """An audit hook which counts the files opened while counting is on."""
+
+    if event == "open" and _counting[0]: _counting[1] += 1
+
+
+def hook_opens():
+    """Installs the audit hook which counts opened files, if it isn't
+    installed already. Audit hooks can't be removed, so this is only done
+    when a benchmark is actually run. Returns whether files can be counted -
+    audit hooks need Python 3.8."""
+
+    if not hasattr(sys, "addaudithook"): return False
+    if not _hooked:
+        sys.addaudithook(count_opens)
+        _hooked.append(count_opens)
+    return True
+
+
+def request(client, url, headers):
+    """Makes one request, returning its status code and the size of its
+    body, or the exception it raised."""
+
+    try:
+        response = client.get(url, **headers)
+    except Exception as e:
+        return None, 0, repr(e)
+    if response.streaming:
+        return response.status_code, len(b"".join(response.streaming_content)), None
+    return response.status_code, len(response.content), None
+
+
+def benchmark(client, url, headers, iterations):
+    """Requests a URL repeatedly and summarises how it performed. The first
+    request is timed on its own, as it may be the one to load data. The rest
+    are timed without any tracing, and then a few more are made with
+    allocations traced and files opened counted, if the audit hook which
+    counts them is installed. If the first request raises
+    an exception, there's nothing to measure and it's reported instead."""
+
+    start = time.perf_counter()
+    status, size, error = request(client, url, headers)
+    first = time.perf_counter() - start
+    result = {"url": url, "status": status, "error": error, "bytes": size, "first": first}
+    if error: return result
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        request(client, url, headers)
+        times.append(time.perf_counter() - start)
+    allocations, opened = [], []
+    for _ in range(min(iterations, 5)):
+        tracemalloc.start()
+        _counting[:] = [True, 0]
+        request(client, url, headers)
+        _counting[0] = False
+        if _hooked: opened.append(_counting[1])
+        allocations.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        **result, "p50": float(np.percentile(times, 50)) if times else None,
+        "p99": float(np.percentile(times, 99)) if times else None,
+        "peak_allocated": int(np.median(allocations)) if allocations else None,
+        "files_opened": int(np.median(opened)) if opened else None
+    }
+
+
+
+class Command(BaseCommand):
+    help = "Measures the performance of the PEKA endpoints against the PEKA data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=50,
+            help="How many times to request each endpoint"
+        )
+        parser.add_argument("--rbp", help="The RBP to request")
+        parser.add_argument("--motif", default="UUUUU", help="The motif to request")
+        parser.add_argument(
+            "--gzip", action="store_true", help="Accept gzipped responses"
+        )
+        parser.add_argument("--output", help="A file to write the results to")
+        parser.add_argument(
+            "--baseline", help="Results from a previous run to compare against"
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="How much slower than the baseline an endpoint's p50 can be"
+        )
+
+
+    def handle(self, *args, **options):
+        rbp = options["rbp"] or sorted(os.listdir(os.path.join(
+            version_directory(current_version()), "rbp"
+        )))[0][:-5]
+        headers = {"HTTP_ACCEPT_ENCODING": "gzip"} if options["gzip"] else {}
+        client = Client()
+        hook_opens()
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            results = {name: benchmark(
+                client, url.format(rbp=rbp, motif=options["motif"]),
+                headers, options["iterations"]
+            ) for name, url in CASES}
+        output = json.dumps({
+            "data": settings.PEKA_DATA, "version": current_version(),
+            "iterations": options["iterations"], "gzip": options["gzip"],
+            "results": results
+        }, indent=4)
+        if options["output"]:
+            with open(options["output"], "w") as f: f.write(output)
+        else:
+            self.stdout.write(output)
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["tolerance"])
+
+
+    def compare(self, results, path, tolerance):
+        """Reports how each endpoint's p50 compares with a previous run, and
+        fails if any is slower by more than the tolerance given."""
+
+        with open(path) as f: baseline = json.load(f)["results"]
+        slower = []
+        for name, result in results.items():
+            before = baseline.get(name, {}).get("p50")
+            if not before or result["p50"] is None: continue
+            ratio = result["p50"] / before
+            self.stderr.write(f"{name}: {before * 1000:.2f}ms -> {result['p50'] * 1000:.2f}ms ({ratio:.2f}x)")
+            if ratio > 1 + tolerance: slower.append(name)
+        if slower:
+            raise CommandError(f"Slower than baseline: {', '.join(slower)}")
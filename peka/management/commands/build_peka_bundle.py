@@ -0,0 +1,64 @@
+import os
+import gc
+import json
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from peka.bundle import build_bundle, RbpBundle
+from peka.store import read_json, current_version, version_directory
+
+def measure(function):
+    """Calls a function twice - once to time it, and once with allocations
+    traced to see how many bytes of memory its return value holds on to."""
+
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    value = function()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, duration, memory
+
+
+
+class Command(BaseCommand):
+    help = "Packs the PEKA RBP JSON files into a single binary bundle"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--benchmark", action="store_true",
+            help="Compare loading the JSON files with loading the bundle"
+        )
+
+
+    def handle(self, *args, **options):
+        directory = version_directory(current_version())
+        start = time.perf_counter()
+        path = build_bundle(directory)
+        self.stdout.write(
+            f"Built {path} ({os.path.getsize(path)} bytes) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        if options["benchmark"]:
+            rbp_directory = os.path.join(directory, "rbp")
+            filenames = [f for f in os.listdir(rbp_directory) if f.endswith(".json")]
+            documents, json_time, json_memory = measure(lambda: {
+                f[:-5]: read_json(os.path.join(rbp_directory, f)) for f in filenames
+            })
+            del documents
+            bundle, bundle_time, bundle_memory = measure(lambda: RbpBundle(path))
+            start = time.perf_counter()
+            for name in bundle.names: bundle.document(name)
+            document_time = (time.perf_counter() - start) / len(bundle.names)
+            self.stdout.write(json.dumps({
+                "rbps": len(filenames),
+                "json": {"load_time": json_time, "memory": json_memory},
+                "bundle": {
+                    "load_time": bundle_time, "memory": bundle_memory,
+                    "document_time": document_time
+                }
+            }, indent=4))
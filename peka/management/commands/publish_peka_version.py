@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from peka.versions import publish
+
+class Command(BaseCommand):
+    help = "Makes a version of the PEKA data in PEKA_DATA/versions the current one"
+
+    def add_arguments(self, parser):
+        parser.add_argument("version", help="The name of the version's directory")
+
+
+    def handle(self, *args, **options):
+        try:
+            publish(options["version"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"PEKA data version {options['version']} is now current")
@@ -0,0 +1,177 @@
+import os
+import numpy as np
+from .store import load, current_version, version_directory
+from .bundle import from_bundle
+
+BASES = "ACGU"
+
+IUPAC = {
+    "A": "A", "C": "C", "G": "G", "U": "U", "T": "U",
+    "R": "AG", "Y": "CU", "S": "CG", "W": "AU", "K": "GU", "M": "AC",
+    "B": "CGU", "D": "AGU", "H": "ACU", "V": "ACG", "N": "ACGU"
+}
+
+class MotifGroups:
+    """The groups that PEKA clusters motifs into, as read from a TSV file of
+    group names and their comma-separated members. Each motif is indexed by
+    sequence, so that finding its group doesn't involve searching."""
+
+    def __init__(self, path):
+        self.groups = {}
+        self.index = {}
+        with open(path) as f:
+            lines = f.read().splitlines()[1:]
+        for line in lines:
+            name, members = line.split("\t")
+            self.groups[name] = members.split(", ")
+            for member in self.groups[name]:
+                self.index[member] = name
+        self.kmers = KmerIndex(self.index)
+
+
+    def group(self, sequence):
+        """Returns the name of the group a motif belongs to, or None if it
+        isn't in any."""
+
+        return self.index.get(sequence)
+
+
+    def search(self, pattern):
+        """Finds all motifs matching an IUPAC pattern, and returns them
+        mapped to their groups."""
+
+        return {motif: self.index[motif] for motif in self.kmers.search(pattern)}
+
+
+
+class KmerIndex:
+    """An index of a set of k-mers for searching with IUPAC patterns.
+
+    Every possible k-mer is given a number, by reading it as a base 4 number,
+    and sets of k-mers are then represented as integers with those bits set.
+    For each position and base there is a bitset of the k-mers with that base
+    at that position, so a pattern can be matched by combining a few bitsets
+    rather than comparing any strings."""
+
+    def __init__(self, kmers):
+        self.k = len(next(iter(kmers))) if kmers else 0
+        self.sequences = [
+            "".join(BASES[(n >> (2 * (self.k - p - 1))) & 3] for p in range(self.k))
+            for n in range(4 ** self.k)
+        ]
+        self.positions = [{base: 0 for base in BASES} for _ in range(self.k)]
+        for n, sequence in enumerate(self.sequences):
+            for position, base in enumerate(sequence):
+                self.positions[position][base] |= 1 << n
+        number = {sequence: n for n, sequence in enumerate(self.sequences)}
+        self.present = 0
+        for kmer in kmers:
+            if kmer in number: self.present |= 1 << number[kmer]
+
+
+    def search(self, pattern):
+        """Returns the k-mers in the index which match an IUPAC pattern, in
+        alphabetical order. A ValueError is raised if the pattern isn't a
+        valid IUPAC pattern of the right length."""
+
+        pattern = pattern.upper()
+        if len(pattern) != self.k:
+            raise ValueError(f"Pattern must be {self.k} characters long")
+        matches = self.present
+        for position, code in enumerate(pattern):
+            if code not in IUPAC:
+                raise ValueError(f"{code} is not an IUPAC nucleotide code")
+            allowed = 0
+            for base in IUPAC[code]:
+                allowed |= self.positions[position][base]
+            matches &= allowed
+        kmers = []
+        while matches:
+            lowest = matches & -matches
+            kmers.append(self.sequences[lowest.bit_length() - 1])
+            matches ^= lowest
+        return kmers
+
+
+
+def get_motif_groups(directory=None):
+    """Returns the motif groups in a data directory - by default, that of the
+    current version - reading them from disk the first time they are needed
+    and again whenever the file changes."""
+
+    directory = directory or version_directory(current_version())
+    path = os.path.join(directory, "motif", "motif_groups.tsv")
+    return load(MotifGroups, path, paths=[path])
+
+
+def motif_from_label(label):
+    """Extracts the motif from a PEKA heatmap row label, which pads the motif
+    with underscores or prefixes it with dots to show its position."""
+
+    return label.replace("_", "").replace(".", "")
+
+
+
+class RbpMotifIndex:
+    """An inverted index of which RBPs each motif appears in, built from the
+    PEKA score heatmaps in an RBP bundle. Each motif maps to the RBPs whose
+    heatmaps include it, along with its PEKA score and its rank by that
+    score within the RBP.
+
+    Each RBP's entries are kept separately, so that when the bundle is
+    rebuilt, a new index can re-use the entries of any RBP whose source file
+    hasn't changed and only re-read the ones that have."""
+
+    def __init__(self, bundle, previous=None):
+        self.bundle = bundle
+        self.sources = bundle.sources
+        self.entries = {}
+        self.reused = 0
+        for name in bundle.names:
+            if previous and previous.sources.get(name) == self.sources[name]:
+                self.entries[name] = previous.entries[name]
+                self.reused += 1
+            else:
+                self.entries[name] = self.rbp_entries(bundle, name)
+        self.index = {}
+        for name, entries in self.entries.items():
+            for motif, score, rank in entries:
+                self.index.setdefault(motif, []).append((name, score, rank))
+        for rbps in self.index.values():
+            rbps.sort(key=lambda rbp: -rbp[1])
+
+
+    @staticmethod
+    def rbp_entries(bundle, name):
+        """Gets the motifs in an RBP's PEKA score heatmap, with their scores
+        and ranks."""
+
+        if "PEKA_score_heatmap" not in bundle.rbps[name]: return []
+        heatmap = bundle.heatmap(name, "PEKA_score_heatmap")
+        scores = heatmap.values[:, 0]
+        ranks = np.empty(len(scores), dtype=int)
+        ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+        return [
+            (motif_from_label(label), score, rank) for label, score, rank
+            in zip(heatmap.rows, scores.tolist(), ranks.tolist())
+        ]
+
+
+    def rbps(self, motif, max_rank=None, min_score=None, cell_line=None):
+        """Returns the RBPs a motif appears in, highest scoring first, as
+        (name, score, rank) tuples - optionally only those where it ranks
+        highly enough, scores highly enough, or from a given cell line."""
+
+        return [(name, score, rank) for name, score, rank in self.index.get(motif, [])
+            if (max_rank is None or rank <= max_rank)
+            and (min_score is None or score >= min_score)
+            and (cell_line is None or name.startswith(f"{cell_line}-"))]
+
+
+
+def get_rbp_motif_index(directory=None):
+    """Returns the inverted motif index for the RBP bundle in a data directory
+    - by default, that of the current version - updating the previous index
+    if the bundle has changed since it was built."""
+
+    return from_bundle(RbpMotifIndex, directory)
@@ -0,0 +1,52 @@
+import numpy as np
+
+METRICS = ["cosine", "pearson"]
+
+def normalise(vectors, metric):
+    """Scales each row of a matrix to unit length, after first centring it if
+    the metric is Pearson correlation, so that the dot product of any two
+    rows is their similarity. Rows with no variation are left as zeros, and
+    missing values are treated as zeros."""
+
+    vectors = np.nan_to_num(np.asarray(vectors, dtype=float))
+    if metric == "pearson":
+        vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def top_k(similarities, k):
+    """Returns the indices of the k largest values in an array, largest
+    first, without sorting the whole array."""
+
+    k = min(k, len(similarities))
+    if k <= 0: return np.array([], dtype=int)
+    indices = np.argpartition(-similarities, k - 1)[:k]
+    return indices[np.argsort(-similarities[indices], kind="stable")]
+
+
+
+class Profiles:
+    """A set of labelled vectors, such as the PEKA scores of each RBP across
+    all motifs, normalised once so that the most similar vectors to any one of
+    them can be found with a single matrix-vector product."""
+
+    def __init__(self, labels, vectors, metric):
+        self.labels = labels
+        self.lookup = {label: index for index, label in enumerate(labels)}
+        self.metric = metric
+        self.vectors = normalise(vectors, metric)
+
+
+    def nearest(self, label, k):
+        """Returns the k labels whose vectors are most similar to the vector of
+        the label given, excluding itself, along with their similarities. A
+        KeyError is raised if the label is unknown."""
+
+        index = self.lookup[label]
+        similarities = self.vectors @ self.vectors[index]
+        similarities[index] = -np.inf
+        return [
+            (self.labels[i], float(similarities[i]))
+            for i in top_k(similarities, min(k, len(self.labels) - 1))
+        ]
@@ -0,0 +1,74 @@
+import json
+import hashlib
+from io import BytesIO
+from gzip import GzipFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.utils.cache import patch_vary_headers
+
+def accepts_gzip(header):
+    """Determines whether an Accept-Encoding header allows a gzipped response -
+    that is, whether it lists gzip, or failing that *, with a non-zero
+    q-value."""
+
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError: quality = 0
+        if coding: qualities[coding.lower()] = quality
+    return qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0))) > 0
+
+
+def compress(body):
+    """Gzips some bytes as thoroughly as possible. The output is always the
+    same for the same input, as no timestamp is included."""
+
+    buffer = BytesIO()
+    with GzipFile(mode="wb", compresslevel=9, fileobj=buffer, mtime=0) as f:
+        f.write(body)
+    return buffer.getvalue()
+
+
+
+class PreparedResponse:
+    """A JSON response whose body is serialised and compressed once, up front,
+    and can then be served any number of times. Each variant of the body has a
+    strong ETag derived from its contents, so clients which already have it
+    can be sent a 304 instead."""
+
+    def __init__(self, data):
+        self.body = json.dumps(
+            data, cls=DjangoJSONEncoder, separators=(",", ":")
+        ).encode()
+        self.gzipped = compress(self.body)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+    def respond(self, request):
+        """Creates a response to a particular request - either the full body,
+        compressed if the client accepts that, or a 304 if the client already
+        has a matching copy."""
+
+        use_gzip = accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        etag = self.gzip_etag if use_gzip else self.etag
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if "*" in etags or self.etag in etags or self.gzip_etag in etags:
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(self.gzipped, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(self.body, content_type="application/json")
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept-Encoding"])
+        response["Cache-Control"] = "no-cache"
+        return response
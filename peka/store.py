@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict, OrderedDict
+from django.conf import settings
+from django.utils.functional import cached_property
+from .responses import PreparedResponse
+from .heatmaps import Heatmap
+from .neighbours import Profiles
+
+HEATMAPS = [
+    ["similarity", "similarity_score"], ["iBAQ", "iBAQ"],
+    ["recall", "recall"], ["introns", "3UTR%_intron%_5UTR+CDS%"],
+    ["noncoding_IDR", "%_noncoding_IDR_peaks"],
+    ["total_IDR", "total_IDR_peaks"], ["dendrogram", "dendrogram"]
+]
+
+_cache = {}
+_locks = defaultdict(threading.Lock)
+
+def file_signature(paths):
+    """Identifies the current state of some files on disk by their
+    modification times and sizes - if any of them are changed, created or
+    deleted, the signature will change too."""
+
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def deep_size(obj, seen=None):
+    """Estimates how many bytes some object occupies in memory, including
+    everything it contains."""
+
+    seen = set() if seen is None else seen
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_size(item, seen)
+    return size
+
+
+def read_json(path):
+    """Parses a JSON file."""
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def version_directory(version=None):
+    """The directory a version of the PEKA data is in. Versions live in the
+    versions directory of PEKA_DATA - if the data isn't versioned, it's in
+    PEKA_DATA itself, and the version is None."""
+
+    if version is None: return settings.PEKA_DATA
+    return os.path.join(settings.PEKA_DATA, "versions", version)
+
+
+def current_version():
+    """The name of the current version of the PEKA data - the version directory
+    the 'current' link in PEKA_DATA points to. If there is no such link, the
+    data isn't versioned and None is returned."""
+
+    try:
+        return os.path.basename(os.readlink(os.path.join(settings.PEKA_DATA, "current")))
+    except OSError: return None
+
+
+def load(build, *args, paths):
+    """Calls build with the arguments given and keeps the result in memory.
+    Later calls with the same arguments get the same object back, without it
+    being built again, for as long as the files at the paths given are
+    unchanged. If building creates any of those files, the files as they are
+    after building are the ones checked."""
+
+    key = (build, args)
+    signature = file_signature(paths)
+    entry = _cache.get(key)
+    if entry is None or entry[0] != signature:
+        with _locks[key]:
+            entry = _cache.get(key)
+            if entry is None or entry[0] != signature:
+                value = build(*args)
+                if None in signature: signature = file_signature(paths)
+                entry = (signature, value)
+                _cache[key] = entry
+    return entry[1]
+
+
+def forget(directory):
+    """Drops everything loaded from a data directory, or from any file in it,
+    so that the memory it occupies can be freed."""
+
+    for key in list(_cache):
+        arg = key[1][0] if key[1] else None
+        if isinstance(arg, str) and (
+            arg == directory or arg.startswith(directory + os.sep)
+        ):
+            _cache.pop(key, None)
+
+
+
+class LruCache:
+    """A store of at most some number of values, each built on demand from its
+    key. When it's full, the least recently used value is dropped."""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def __contains__(self, key):
+        return key in self.values
+
+
+    def __len__(self):
+        return len(self.values)
+
+
+    def get(self, key, build):
+        """Returns the value for a key, calling build to create it if it isn't
+        already stored."""
+
+        with self.lock:
+            if key in self.values:
+                self.values.move_to_end(key)
+                return self.values[key]
+        value = build()
+        with self.lock:
+            self.values[key] = value
+            while len(self.values) > self.size:
+                self.values.popitem(last=False)
+        return value
+
+
+class PekaDataset:
+    """The main PEKA heatmap and the heatmaps that accompany it, read from disk
+    once and then held in memory. It records how long it took to load and
+    roughly how much memory it occupies."""
+
+    def __init__(self, directory):
+        start = time.perf_counter()
+        self.directory = directory
+        self.version = hashlib.sha1(
+            repr(file_signature(self.paths(directory))).encode()
+        ).hexdigest()[:12]
+        with open(os.path.join(directory, "main_heatmap.json")) as f:
+            self.data = json.load(f)
+        for key, filename in HEATMAPS:
+            with open(os.path.join(directory, f"{filename}.json")) as f:
+                self.data[key] = json.load(f)
+        self.load_time = time.perf_counter() - start
+        self.memory = deep_size(self.data)
+        self.heatmaps = {}
+        self.neighbours = {}
+
+
+    @staticmethod
+    def paths(directory):
+        """The files a dataset in a given directory is loaded from."""
+
+        return [os.path.join(directory, "main_heatmap.json")] + [
+            os.path.join(directory, f"{filename}.json") for _, filename in HEATMAPS
+        ]
+
+
+    @property
+    def proteins(self):
+        return self.data["columns"]
+
+
+    @property
+    def motifs(self):
+        return self.data["rows"]
+
+
+    def heatmap(self, key):
+        """Returns one of the dataset's heatmaps - either 'main' for the main
+        heatmap, or the key of one of the others. A KeyError is raised if
+        there's no heatmap with that key."""
+
+        if key not in self.heatmaps:
+            if key == "main":
+                source = {k: v for k, v in self.data.items() if k not in dict(HEATMAPS)}
+            elif key in dict(HEATMAPS) and "matrix" in self.data[key]:
+                source = self.data[key]
+            else: raise KeyError(key)
+            self.heatmaps[key] = Heatmap.from_json(source, [])
+        return self.heatmaps[key]
+
+
+    def profiles(self, axis, metric):
+        """Returns the profiles of either every RBP ('rbp') or every motif
+        ('motif') across the main heatmap, normalised for the metric given."""
+
+        if (axis, metric) not in self.neighbours:
+            heatmap = self.heatmap("main")
+            if axis == "rbp":
+                profiles = Profiles(heatmap.columns, heatmap.values.T, metric)
+            else:
+                profiles = Profiles(heatmap.rows, heatmap.values, metric)
+            self.neighbours[(axis, metric)] = profiles
+        return self.neighbours[(axis, metric)]
+
+
+    @cached_property
+    def response(self):
+        """The whole dataset, ready to be sent to clients."""
+
+        return PreparedResponse(self.data)
+
+
+    @cached_property
+    def values_response(self):
+        """The whole dataset, with only values in its matrices, ready to be
+        sent to clients."""
+
+        data = {**self.data, "matrix": self.heatmap("main").matrix(values_only=True)}
+        for key, _ in HEATMAPS:
+            if "matrix" in data[key]:
+                data[key] = {
+                    **data[key], "matrix": self.heatmap(key).matrix(values_only=True)
+                }
+        return PreparedResponse(data)
+
+
+    @cached_property
+    def entities_response(self):
+        """The names of the proteins and motifs, ready to be sent to
+        clients."""
+
+        return PreparedResponse({
+            "proteins": self.proteins, "motifs": self.motifs
+        })
+
+
+
+def get_dataset(directory=None):
+    """Returns the PEKA dataset in a data directory - by default, that of the
+    current version - loading it from disk the first time it is needed and
+    again whenever its files change."""
+
+    directory = directory or version_directory(current_version())
+    return load(PekaDataset, directory, paths=PekaDataset.paths(directory))
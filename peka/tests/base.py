@@ -0,0 +1,71 @@
+import os
+import json
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from peka import bundle
+from peka.store import HEATMAPS
+
+class PekaTest(TestCase):
+    """Creates a copy of part of the PEKA data in a temporary directory, with
+    a small main heatmap of its own, and points the PEKA_DATA setting at it
+    for the duration of each test. Tiles are cached in another temporary
+    directory, and the RBP files are checked for changes every time the
+    bundle is used."""
+
+    rbps = ["HepG2-AQR", "HepG2-TIA1", "K562-TIA1"]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for _, filename in HEATMAPS:
+            shutil.copy(
+                os.path.join("peka", "data", f"{filename}.json"), self.directory
+            )
+        os.mkdir(os.path.join(self.directory, "motif"))
+        shutil.copy(
+            os.path.join("peka", "data", "motif", "motif_groups.tsv"),
+            os.path.join(self.directory, "motif")
+        )
+        os.mkdir(os.path.join(self.directory, "rbp"))
+        for rbp in self.rbps:
+            shutil.copy(
+                os.path.join("peka", "data", "rbp", f"{rbp}.json"),
+                os.path.join(self.directory, "rbp")
+            )
+        self.write_json("main_heatmap.json", {
+            "cmap": ["#ffffff", "#000000"],
+            "columns": self.rbps,
+            "rows": ["GGUCG", "UUUUU", "CUCUC", "GAAGA"],
+            "matrix": [[
+                {"color": "#000000", "value": (row + 1) * (col + 2) % 5}
+                for col in range(len(self.rbps))
+            ] for row in range(4)]
+        })
+        self.tiles = tempfile.mkdtemp()
+        self.override = override_settings(
+            PEKA_DATA=self.directory, PEKA_TILES=self.tiles, PEKA_SOURCES_INTERVAL=0
+        )
+        self.override.enable()
+    
+
+    def tearDown(self):
+        self.wait_for_rebuild()
+        self.override.disable()
+        shutil.rmtree(self.directory)
+        shutil.rmtree(self.tiles)
+    
+
+    def wait_for_rebuild(self):
+        for rebuild in list(bundle._rebuilds.values()): rebuild.join()
+    
+
+    def write_json(self, filename, data):
+        """Writes some JSON to a file in the data directory, making sure its
+        modification time is different from whatever it was before."""
+
+        path = os.path.join(self.directory, filename)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        with open(path, "w") as f:
+            json.dump(data, f)
+        if os.stat(path).st_mtime_ns == mtime:
+            os.utime(path, ns=(mtime + 1000, mtime + 1000))
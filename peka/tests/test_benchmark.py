@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from .base import PekaTest
+
+class BenchmarkCommandTests(PekaTest):
+
+    def setUp(self):
+        PekaTest.setUp(self)
+        self.output = os.path.join(self.directory, "benchmark.json")
+
+
+    def test_benchmark_results(self):
+        call_command("benchmark_peka", iterations=3, rbp="HepG2-AQR", output=self.output)
+        with open(self.output) as f:
+            results = json.load(f)["results"]
+        self.assertEqual(set(results), {
+            "data", "data_values", "entities", "rbp", "rbp_values", "motif"
+        })
+        self.assertEqual(results["rbp"]["url"], "/peka/rbp?name=HepG2-AQR")
+        for name in ["data", "entities", "rbp"]:
+            self.assertEqual(results[name]["status"], 200)
+            self.assertGreater(results[name]["bytes"], 0)
+            self.assertLessEqual(results[name]["p50"], results[name]["p99"])
+            self.assertGreater(results[name]["peak_allocated"], 0)
+            self.assertEqual(
+                results[name]["files_opened"], 0 if hasattr(sys, "addaudithook") else None
+            )
+        self.assertEqual(results["motif"]["status"], 404)
+    
+
+    def test_benchmark_against_baseline(self):
+        call_command("benchmark_peka", iterations=3, output=self.output)
+        with open(self.output) as f:
+            baseline = json.load(f)
+        for result in baseline["results"].values():
+            if result.get("p50"): result["p50"] /= 1000
+        with open(self.output, "w") as f:
+            json.dump(baseline, f)
+        with open(os.devnull, "w") as devnull:
+            with self.assertRaises(CommandError):
+                call_command(
+                    "benchmark_peka", iterations=3, stdout=devnull,
+                    stderr=devnull, baseline=self.output
+                )
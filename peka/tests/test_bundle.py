@@ -0,0 +1,178 @@
+import os
+import json
+import time
+from unittest.mock import patch
+from django.core.management import call_command
+from peka.bundle import *
+from peka.store import read_json
+from .base import PekaTest
+
+class BundleTests(PekaTest):
+
+    def test_bundle_matches_json(self):
+        bundle = RbpBundle(build_bundle(self.directory))
+        self.assertEqual(bundle.names, sorted(self.rbps))
+        for name in self.rbps:
+            original = read_json(os.path.join(self.directory, "rbp", f"{name}.json"))
+            document = bundle.document(name)
+            self.assertEqual(list(document), list(original))
+            for key, section in original.items():
+                self.assertEqual(list(document[key]), list(section))
+                for field, value in section.items():
+                    if field != "matrix":
+                        self.assertEqual(document[key][field], value)
+                for row1, row2 in zip(document[key]["matrix"], section["matrix"]):
+                    for cell1, cell2 in zip(row1, row2):
+                        self.assertEqual(cell1["color"], cell2["color"])
+                        self.assertEqual(cell1["value"], cell2["value"])
+            self.assertEqual(json.dumps(document), json.dumps(original))
+    
+
+    def test_bundle_shares_labels(self):
+        bundle = RbpBundle(build_bundle(self.directory))
+        self.assertEqual(len(bundle.column_sets), 2)
+        self.assertEqual(bundle.values.dtype.itemsize, 8)
+        self.assertEqual(bundle.values.size, 3 * 40 * 52)
+        self.assertEqual(bundle.colors.size, 3 * 40 * 52)
+    
+
+    def test_rebuild_reuses_unchanged_rbps(self):
+        previous = RbpBundle(build_bundle(self.directory))
+        path = os.path.join(self.directory, "rbp", "HepG2-TIA1.json")
+        document = read_json(path)
+        document["rbp_heatmap"]["matrix"][0][0] = {"color": "#123456", "value": None}
+        self.write_json(os.path.join("rbp", "HepG2-TIA1.json"), document)
+        with patch("peka.bundle.read_json", wraps=read_json) as read:
+            bundle = RbpBundle(build_bundle(self.directory, previous))
+        self.assertEqual([c[0][0] for c in read.call_args_list], [path])
+        for name in self.rbps:
+            original = read_json(os.path.join(self.directory, "rbp", f"{name}.json"))
+            self.assertEqual(json.dumps(bundle.document(name)), json.dumps(original))
+        self.assertEqual(bundle.sources, source_signatures(self.directory))
+    
+
+    def test_bundle_rejects_other_files(self):
+        path = os.path.join(self.directory, "iBAQ.json")
+        with self.assertRaises(ValueError):
+            RbpBundle(path)
+    
+
+    def test_get_bundle_builds_bundle_if_needed(self):
+        self.assertFalse(os.path.exists(bundle_path(self.directory)))
+        self.assertEqual(get_bundle().names, sorted(self.rbps))
+        self.assertTrue(os.path.exists(bundle_path(self.directory)))
+        self.assertIs(get_bundle(), get_bundle())
+    
+
+    def test_get_bundle_reloads_rebuilt_bundle(self):
+        bundle = get_bundle()
+        os.remove(os.path.join(self.directory, "rbp", "K562-TIA1.json"))
+        build_bundle(self.directory)
+        os.utime(bundle_path(self.directory), ns=(1, 1))
+        self.assertEqual(get_bundle().names, ["HepG2-AQR", "HepG2-TIA1"])
+    
+
+    def test_get_bundle_notices_changed_sources(self):
+        bundle = get_bundle()
+        self.assertIs(get_bundle(), bundle)
+        self.write_json(os.path.join("rbp", "HepG2-AQR.json"), {})
+        self.assertIs(get_bundle(), bundle)
+        self.wait_for_rebuild()
+        bundle = get_bundle()
+        self.assertEqual(bundle.rbps["HepG2-AQR"], {})
+        self.assertIs(get_bundle(), bundle)
+        os.remove(os.path.join(self.directory, "rbp", "K562-TIA1.json"))
+        get_bundle()
+        self.wait_for_rebuild()
+        self.assertEqual(get_bundle().names, ["HepG2-AQR", "HepG2-TIA1"])
+    
+
+    def test_stale_bundle_served_until_rebuilt(self):
+        build_bundle(self.directory)
+        self.write_json(os.path.join("rbp", "HepG2-AQR.json"), {})
+        with patch("peka.bundle.build_bundle", wraps=build_bundle) as build:
+            self.assertNotEqual(get_bundle().rbps["HepG2-AQR"], {})
+            self.wait_for_rebuild()
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual(get_bundle().rbps["HepG2-AQR"], {})
+    
+
+    def test_sources_checked_at_intervals(self):
+        with self.settings(PEKA_SOURCES_INTERVAL=60):
+            bundle = get_bundle(self.directory)
+            with patch("peka.bundle.source_signatures") as signatures:
+                self.write_json(os.path.join("rbp", "HepG2-AQR.json"), {})
+                for _ in range(10): self.assertIs(get_bundle(), bundle)
+                self.assertFalse(signatures.called)
+            with patch("time.monotonic", return_value=time.monotonic() + 61):
+                get_bundle()
+            self.wait_for_rebuild()
+            self.assertEqual(get_bundle().rbps["HepG2-AQR"], {})
+    
+
+    def test_bundle_is_mapped(self):
+        bundle = RbpBundle(build_bundle(self.directory))
+        self.assertFalse(bundle.values.flags.writeable)
+        self.assertFalse(bundle.values.flags.owndata)
+        self.assertEqual(set(bundle.sources), set(self.rbps))
+    
+
+    def test_stale_bundle_is_rebuilt_when_opened(self):
+        build_bundle(self.directory)
+        self.write_json(os.path.join("rbp", "HepG2-AQR.json"), {})
+        self.assertEqual(open_bundle(self.directory).rbps["HepG2-AQR"], {})
+        os.remove(os.path.join(self.directory, "rbp", "K562-TIA1.json"))
+        self.assertEqual(open_bundle(self.directory).names, ["HepG2-AQR", "HepG2-TIA1"])
+    
+
+    def test_invalid_bundle_is_rebuilt_when_opened(self):
+        with open(bundle_path(self.directory), "wb") as f:
+            f.write(b"PEKA")
+        self.assertEqual(open_bundle(self.directory).names, sorted(self.rbps))
+    
+
+    def test_command_builds_bundle(self):
+        with open(os.devnull, "w") as f:
+            call_command("build_peka_bundle", stdout=f)
+        self.assertTrue(os.path.exists(bundle_path(self.directory)))
+
+
+
+class BundleProjectionTests(PekaTest):
+
+    def setUp(self):
+        PekaTest.setUp(self)
+        self.bundle = RbpBundle(build_bundle(self.directory))
+        self.document = self.bundle.document("HepG2-TIA1")
+    
+
+    def test_can_project_fields(self):
+        self.assertEqual(self.bundle.project("HepG2-TIA1", [
+            "PEKA_score_heatmap.matrix", "rbp_heatmap.rows"
+        ]), {
+            "PEKA_score_heatmap": {"matrix": self.document["PEKA_score_heatmap"]["matrix"]},
+            "rbp_heatmap": {"rows": self.document["rbp_heatmap"]["rows"]}
+        })
+    
+
+    def test_can_project_sections_and_nested_fields(self):
+        self.assertEqual(self.bundle.project("HepG2-TIA1", [
+            "rbp_heatmap", "PEKA_score_heatmap.colorbar_vmin_vmax.vmax"
+        ]), {
+            "rbp_heatmap": self.document["rbp_heatmap"],
+            "PEKA_score_heatmap": {"colorbar_vmin_vmax": {
+                "vmax": self.document["PEKA_score_heatmap"]["colorbar_vmin_vmax"]["vmax"]
+            }}
+        })
+    
+
+    def test_unrequested_matrices_not_built(self):
+        with patch("peka.bundle.Heatmap.matrix") as matrix:
+            self.bundle.project("HepG2-TIA1", ["rbp_heatmap.rows", "rbp_heatmap.hlines"])
+        self.assertFalse(matrix.called)
+    
+
+    def test_invalid_paths(self):
+        for path in ["xxx", "rbp_heatmap.xxx", "rbp_heatmap.rows.xxx", "rbp_heatmap.hlines.xxx"]:
+            with self.assertRaises(KeyError):
+                self.bundle.project("HepG2-TIA1", [path])
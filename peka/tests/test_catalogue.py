@@ -0,0 +1,46 @@
+import os
+from peka.bundle import get_bundle
+from peka.catalogue import *
+from .base import PekaTest
+
+class CatalogueTests(PekaTest):
+
+    def test_catalogue_entries(self):
+        catalogue = Catalogue(get_bundle())
+        self.assertEqual([e["name"] for e in catalogue.entries], sorted(self.rbps))
+        entry = catalogue.entries[0]
+        self.assertEqual(entry["cell_line"], "HepG2")
+        self.assertEqual(entry["protein"], "AQR")
+        self.assertEqual(entry["heatmaps"]["rbp_heatmap"], [40, 51])
+        self.assertEqual(entry["heatmaps"]["PEKA_score_heatmap"], [40, 1])
+        self.assertEqual(len(entry["top_motifs"]), TOP_MOTIFS)
+        heatmap = get_bundle().heatmap("HepG2-AQR", "PEKA_score_heatmap")
+        best = heatmap.rows[heatmap.values[:, 0].argmax()]
+        self.assertEqual(entry["top_motifs"][0], best.replace("_", "").replace(".", ""))
+    
+
+    def test_can_find_by_prefix(self):
+        catalogue = Catalogue(get_bundle())
+        names = lambda entries: [e["name"] for e in entries]
+        self.assertEqual(names(catalogue.find(prefix="hepg2")), ["HepG2-AQR", "HepG2-TIA1"])
+        self.assertEqual(names(catalogue.find(prefix="TIA")), ["HepG2-TIA1", "K562-TIA1"])
+        self.assertEqual(names(catalogue.find(prefix="X")), [])
+        self.assertEqual(names(catalogue.find()), sorted(self.rbps))
+    
+
+    def test_can_find_by_substring_and_cell_line(self):
+        catalogue = Catalogue(get_bundle())
+        names = lambda entries: [e["name"] for e in entries]
+        self.assertEqual(names(catalogue.find(search="2-t")), ["HepG2-TIA1", "K562-TIA1"])
+        self.assertEqual(names(catalogue.find(search="tia", cell_line="K562")), ["K562-TIA1"])
+        self.assertEqual(names(catalogue.find(prefix="tia", cell_line="HepG2")), ["HepG2-TIA1"])
+    
+
+    def test_catalogue_built_once_per_bundle(self):
+        catalogue = get_catalogue()
+        self.assertIs(get_catalogue(), catalogue)
+        self.write_json(os.path.join("rbp", "K562-TIA1.json"), {})
+        self.assertIs(get_catalogue(), catalogue)
+        self.wait_for_rebuild()
+        self.assertIsNot(get_catalogue(), catalogue)
+        self.assertEqual(get_catalogue().entries[-1]["heatmaps"], {})
@@ -0,0 +1,66 @@
+import numpy as np
+from django.test import TestCase
+from peka.clustering import *
+
+class LinkageTests(TestCase):
+
+    def setUp(self):
+        points = np.array([0, 1, 5, 6, 20])
+        self.distances = abs(points[:, None] - points[None, :])
+
+
+    def test_average_linkage(self):
+        self.assertEqual(linkage(self.distances, "average").tolist(), [
+            [0, 1, 1, 2], [2, 3, 1, 2], [5, 6, 5, 4], [4, 7, 17, 5]
+        ])
+    
+
+    def test_complete_linkage(self):
+        self.assertEqual(linkage(self.distances, "complete").tolist(), [
+            [0, 1, 1, 2], [2, 3, 1, 2], [5, 6, 6, 4], [4, 7, 20, 5]
+        ])
+    
+
+    def test_linkage_matches_exhaustive_search(self):
+        vectors = np.random.RandomState(1).rand(40, 6)
+        matrix = distances(vectors, "cosine")
+        for method in METHODS:
+            clusters = {i: [i] for i in range(40)}
+            expected = []
+            for step in range(39):
+                pairs = [(a, b) for a in clusters for b in clusters if a < b]
+                combine = np.mean if method == "average" else np.max
+                a, b = min(pairs, key=lambda p: combine(matrix[np.ix_(clusters[p[0]], clusters[p[1]])]))
+                distance = combine(matrix[np.ix_(clusters[a], clusters[b])])
+                clusters[40 + step] = clusters.pop(a) + clusters.pop(b)
+                expected.append([a, b, distance, len(clusters[40 + step])])
+            for row1, row2 in zip(linkage(matrix, method).tolist(), expected):
+                self.assertEqual(row1[:2], row2[:2])
+                self.assertAlmostEqual(row1[2], row2[2])
+                self.assertEqual(row1[3], row2[3])
+    
+
+    def test_small_linkages(self):
+        self.assertEqual(linkage(np.zeros((1, 1)), "average").tolist(), [])
+        self.assertEqual(leaves(linkage(np.zeros((1, 1)), "average"), 1), [0])
+        self.assertEqual(leaves([], 0), [])
+    
+
+    def test_leaves(self):
+        self.assertEqual(leaves(linkage(self.distances, "average"), 5), [4, 0, 1, 2, 3])
+    
+
+    def test_distances(self):
+        matrix = distances([[1, 0], [0, 1], [2, 0]], "cosine")
+        self.assertEqual(matrix.tolist(), [[0, 1, 0], [1, 0, 1], [0, 1, 0]])
+
+
+
+class ClusteringCacheTests(TestCase):
+
+    def test_clusterings_cached(self):
+        build = lambda: object()
+        key = clustering_key("v1", ["A", "B"], "cosine")
+        first = get_clustering(key, build)
+        self.assertIs(get_clustering(key, build), first)
+        self.assertNotEqual(clustering_key("v1", ["A", "C"], "cosine"), key)
@@ -0,0 +1,57 @@
+import numpy as np
+from django.test import TestCase
+from peka.motifs import get_rbp_motif_index
+from peka.comparison import *
+from .base import PekaTest
+
+class RankTests(TestCase):
+
+    def test_ranks(self):
+        self.assertEqual(rank([0.5, 0.1, 0.9]).tolist(), [2, 1, 3])
+        self.assertEqual(rank([2, 1, 2, 3]).tolist(), [2.5, 1, 2.5, 4])
+        self.assertEqual(rank([]).tolist(), [])
+    
+
+    def test_spearman(self):
+        self.assertAlmostEqual(spearman([1, 2, 3, 4], [10, 20, 30, 400]), 1)
+        self.assertAlmostEqual(spearman([1, 2, 3], [3, 2, 1]), -1)
+        self.assertAlmostEqual(spearman([1, 2, 3, 4], [1, 3, 2, 4]), 0.8)
+        self.assertIsNone(spearman([1], [2]))
+        self.assertIsNone(spearman([1, 2], [3, 3]))
+
+
+
+class ComparisonTests(PekaTest):
+
+    def test_can_compare_rbps(self):
+        index = get_rbp_motif_index()
+        comparison = compare(index, "HepG2-TIA1", "K562-TIA1")
+        a = {motif: (score, rank) for motif, score, rank in index.entries["HepG2-TIA1"]}
+        b = {motif: (score, rank) for motif, score, rank in index.entries["K562-TIA1"]}
+        shared = set(a) & set(b)
+        self.assertEqual({m["motif"] for m in comparison["motifs"]}, shared)
+        self.assertEqual(set(comparison["only"]["HepG2-TIA1"]), set(a) - shared)
+        for motif in comparison["motifs"]:
+            self.assertEqual(motif["scores"], [a[motif["motif"]][0], b[motif["motif"]][0]])
+            self.assertAlmostEqual(motif["delta"], motif["scores"][1] - motif["scores"][0])
+            self.assertEqual(motif["rank_change"], b[motif["motif"]][1] - a[motif["motif"]][1])
+        deltas = [abs(m["delta"]) for m in comparison["motifs"]]
+        self.assertEqual(deltas, sorted(deltas, reverse=True))
+        self.assertEqual(set(comparison["shared_top"]), {
+            m for m in shared if a[m][1] <= TOP_MOTIFS and b[m][1] <= TOP_MOTIFS
+        })
+        self.assertGreater(comparison["correlation"], 0)
+    
+
+    def test_rbp_compared_with_itself(self):
+        comparison = compare(get_rbp_motif_index(), "HepG2-AQR", "HepG2-AQR")
+        self.assertAlmostEqual(comparison["correlation"], 1)
+        self.assertEqual(len(comparison["shared_top"]), TOP_MOTIFS)
+        self.assertEqual({m["delta"] for m in comparison["motifs"]}, {0})
+    
+
+    def test_comparisons_cached(self):
+        index = get_rbp_motif_index()
+        comparison = get_comparison(index, "HepG2-AQR", "K562-TIA1")
+        self.assertIs(get_comparison(index, "HepG2-AQR", "K562-TIA1"), comparison)
+        self.assertIsNot(get_comparison(index, "K562-TIA1", "HepG2-AQR"), comparison)
@@ -0,0 +1,83 @@
+import numpy as np
+from django.test import TestCase
+from peka.heatmaps import *
+
+class SelectorTests(TestCase):
+
+    def test_can_select_labels(self):
+        self.assertEqual(select(["A", "B", "C"], "C,A"), [2, 0])
+        self.assertEqual(select([-1, 0, 1], "0,1"), [1, 2])
+    
+
+    def test_can_select_ranges(self):
+        self.assertEqual(select(["A", "B", "C", "D"], "1:3"), [1, 2])
+        self.assertEqual(select(["A", "B", "C", "D"], ":2,3:"), [0, 1, 3])
+        self.assertEqual(select(["A", "B", "C", "D"], "-1:,A"), [3, 0])
+    
+
+    def test_invalid_selectors(self):
+        with self.assertRaises(KeyError):
+            select(["A", "B"], "C")
+        with self.assertRaises(ValueError):
+            select(["A", "B"], "1:x")
+        with self.assertRaises(ValueError):
+            select(["A", "B"], "1:2:3")
+    
+
+    def test_repeated_selections_rejected(self):
+        for selector in ["A,A", ":,:", "0:2,B", "C,-2:"]:
+            with self.assertRaises(ValueError) as context:
+                select(["A", "B", "C"], selector)
+            self.assertIn("only be selected once", str(context.exception))
+
+
+
+class HeatmapTests(TestCase):
+
+    def setUp(self):
+        self.json = {"cmap": ["#000000"], "rows": ["A", "B"], "columns": [1, 2, 3], "matrix": [
+            [{"color": "#000000", "value": 1.5}, {"color": "#ffffff", "value": 2}, {"color": "#000000", "value": 3}],
+            [{"color": "#ffffff", "value": 4}, {"color": "#ff0000", "value": 5}, {"color": "#000000", "value": 6}],
+        ]}
+
+
+    def test_json_round_trip(self):
+        heatmap = Heatmap.from_json(self.json, [])
+        self.assertEqual(heatmap.palette, ["#000000", "#ffffff", "#ff0000"])
+        self.assertEqual(heatmap.colors.tolist(), [[0, 1, 0], [1, 2, 0]])
+        self.assertEqual(heatmap.fields, {"cmap": ["#000000"]})
+        self.assertEqual(heatmap.to_json(), self.json)
+    
+
+    def test_can_select_submatrix(self):
+        heatmap = Heatmap.from_json(self.json, []).select("B", "2,0:1")
+        self.assertEqual(heatmap.rows, ["B"])
+        self.assertEqual(heatmap.columns, [2, 1])
+        self.assertEqual(heatmap.values.tolist(), [[5, 4]])
+        self.assertEqual(heatmap.matrix(), [[
+            {"color": "#ff0000", "value": 5}, {"color": "#ffffff", "value": 4}
+        ]])
+        self.assertEqual(heatmap.fields, {"cmap": ["#000000"]})
+    
+
+    def test_missing_values_round_trip(self):
+        self.json["matrix"][1][2]["value"] = None
+        heatmap = Heatmap.from_json(self.json, [])
+        self.assertTrue(np.isnan(heatmap.values[1, 2]))
+        self.assertEqual(heatmap.to_json(), self.json)
+        self.assertEqual(heatmap.select("B", "3").matrix(), [[{"color": "#000000", "value": None}]])
+    
+
+    def test_selecting_nothing_keeps_everything(self):
+        heatmap = Heatmap.from_json(self.json, []).select()
+        self.assertEqual(heatmap.to_json(), self.json)
+    
+
+    def test_values_only_matrix(self):
+        heatmap = Heatmap.from_json(self.json, [])
+        self.assertEqual(heatmap.matrix(values_only=True), {
+            "shape": [2, 3], "values": [1.5, 2, 3, 4, 5, 6]
+        })
+        self.assertEqual(heatmap.to_json(values_only=True)["matrix"]["shape"], [2, 3])
+        heatmap.values[0, 1] = np.nan
+        self.assertEqual(heatmap.matrix(values_only=True)["values"], [1.5, None, 3, 4, 5, 6])
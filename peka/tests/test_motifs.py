@@ -0,0 +1,112 @@
+import os
+from unittest.mock import patch
+from django.test import TestCase
+from peka.motifs import *
+from peka.bundle import get_bundle
+from peka.store import read_json
+from .base import PekaTest
+
+class MotifGroupsTests(PekaTest):
+
+    def test_groups_are_indexed(self):
+        groups = get_motif_groups()
+        self.assertEqual(len(groups.groups), 24)
+        self.assertNotIn("cl_name", groups.groups)
+        self.assertEqual(groups.groups["CAGG"][:2], ["CCAGG", "GGCAG"])
+        self.assertEqual(groups.group("GGUCG"), "AGGU")
+        self.assertEqual(groups.group("UGUGG"), "KGUG")
+        self.assertIsNone(groups.group("XXXXX"))
+    
+
+    def test_groups_are_kept_in_memory(self):
+        self.assertIs(get_motif_groups(), get_motif_groups())
+    
+
+    def test_groups_reload_when_file_changes(self):
+        groups = get_motif_groups()
+        path = os.path.join(self.directory, "motif", "motif_groups.tsv")
+        with open(path, "w") as f:
+            f.write("cl_name\tmotifs\nAAAA\tAAAAA, AAAAC\n")
+        os.utime(path, ns=(1, 1))
+        self.assertIsNot(get_motif_groups(), groups)
+        self.assertEqual(get_motif_groups().group("AAAAC"), "AAAA")
+        self.assertIsNone(get_motif_groups().group("GGUCG"))
+
+
+
+class KmerIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = KmerIndex(["GGUCG", "GGUCC", "AGUGU", "UUUUU", "CAGGA"])
+
+
+    def test_exact_pattern(self):
+        self.assertEqual(self.index.search("GGUCG"), ["GGUCG"])
+        self.assertEqual(self.index.search("GGUCA"), [])
+    
+
+    def test_wildcard_pattern(self):
+        self.assertEqual(self.index.search("GGUNN"), ["GGUCC", "GGUCG"])
+        self.assertEqual(self.index.search("NNNNN"), [
+            "AGUGU", "CAGGA", "GGUCC", "GGUCG", "UUUUU"
+        ])
+    
+
+    def test_iupac_pattern(self):
+        self.assertEqual(self.index.search("RGUSS"), ["GGUCC", "GGUCG"])
+        self.assertEqual(self.index.search("rgugy"), ["AGUGU"])
+        self.assertEqual(self.index.search("TTTTT"), ["UUUUU"])
+    
+
+    def test_invalid_patterns(self):
+        with self.assertRaises(ValueError):
+            self.index.search("GGU")
+        with self.assertRaises(ValueError):
+            self.index.search("GGUXN")
+
+
+
+class RbpMotifIndexTests(PekaTest):
+
+    def test_motif_from_label(self):
+        self.assertEqual(motif_from_label("__UCUUU____"), "UCUUU")
+        self.assertEqual(motif_from_label("...CUCUC"), "CUCUC")
+    
+
+    def test_index_contains_every_rbp_motif(self):
+        index = RbpMotifIndex(get_bundle())
+        self.assertEqual(sum(len(rbps) for rbps in index.index.values()), 120)
+        for name, score, rank in index.rbps("UUUUU"):
+            self.assertIn(name, self.rbps)
+            self.assertGreaterEqual(rank, 1)
+            self.assertLessEqual(rank, 40)
+        entries = index.entries["HepG2-AQR"]
+        self.assertEqual(sorted(rank for _, _, rank in entries), list(range(1, 41)))
+        top = min(entries, key=lambda entry: entry[2])
+        self.assertEqual(top[1], max(entry[1] for entry in entries))
+    
+
+    def test_index_filtering(self):
+        index = RbpMotifIndex(get_bundle())
+        all_rbps = index.rbps("UUUUU")
+        self.assertEqual(len(all_rbps), 3)
+        self.assertEqual([rbp[1] for rbp in all_rbps], sorted([rbp[1] for rbp in all_rbps], reverse=True))
+        self.assertEqual([rbp[0] for rbp in index.rbps("UUUUU", cell_line="K562")], ["K562-TIA1"])
+        for name, score, rank in index.rbps("UUUUU", max_rank=5, min_score=10):
+            self.assertLessEqual(rank, 5)
+            self.assertGreaterEqual(score, 10)
+        self.assertEqual(index.rbps("XXXXX"), [])
+    
+
+    def test_index_updated_incrementally(self):
+        index = get_rbp_motif_index()
+        self.assertIs(get_rbp_motif_index(), index)
+        self.write_json(os.path.join("rbp", "K562-TIA1.json"), {})
+        with patch("peka.bundle.read_json", wraps=read_json) as read:
+            self.assertIs(get_rbp_motif_index(), index)
+            self.wait_for_rebuild()
+            new_index = get_rbp_motif_index()
+        self.assertEqual(read.call_count, 1)
+        self.assertIsNot(new_index, index)
+        self.assertEqual(new_index.reused, 2)
+        self.assertIs(new_index.entries["HepG2-AQR"], index.entries["HepG2-AQR"])
@@ -0,0 +1,51 @@
+import numpy as np
+from django.test import TestCase
+from peka.neighbours import *
+
+class NormalisationTests(TestCase):
+
+    def test_cosine_normalisation(self):
+        vectors = normalise([[3, 4], [0, 0], [1, np.nan]], "cosine")
+        self.assertEqual(vectors.tolist(), [[0.6, 0.8], [0, 0], [1, 0]])
+    
+
+    def test_pearson_normalisation(self):
+        vectors = normalise([[1, 2, 3], [2, 2, 2]], "pearson")
+        self.assertAlmostEqual(vectors[0, 0], -1 / np.sqrt(2))
+        self.assertAlmostEqual(vectors[0, 1], 0)
+        self.assertEqual(vectors[1].tolist(), [0, 0, 0])
+
+
+
+class TopKTests(TestCase):
+
+    def test_top_k(self):
+        values = np.array([0.1, 0.9, 0.5, 0.7, 0.2])
+        self.assertEqual(top_k(values, 3).tolist(), [1, 3, 2])
+        self.assertEqual(top_k(values, 10).tolist(), [1, 3, 2, 4, 0])
+        self.assertEqual(top_k(values, 0).tolist(), [])
+
+
+
+class ProfilesTests(TestCase):
+
+    def test_nearest_by_cosine(self):
+        profiles = Profiles(["A", "B", "C", "D"], [
+            [1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [10, 0, 1]
+        ], "cosine")
+        nearest = profiles.nearest("A", 2)
+        self.assertEqual([label for label, _ in nearest], ["D", "B"])
+        self.assertAlmostEqual(nearest[0][1], 10 / np.sqrt(101))
+        self.assertEqual(len(profiles.nearest("A", 10)), 3)
+        with self.assertRaises(KeyError):
+            profiles.nearest("E", 2)
+    
+
+    def test_nearest_by_pearson(self):
+        profiles = Profiles(["A", "B", "C"], [
+            [1, 2, 3], [10, 20, 30], [3, 2, 1]
+        ], "pearson")
+        nearest = profiles.nearest("A", 2)
+        self.assertEqual(nearest[0][0], "B")
+        self.assertAlmostEqual(nearest[0][1], 1)
+        self.assertAlmostEqual(nearest[1][1], -1)
@@ -0,0 +1,82 @@
+import os
+from unittest.mock import Mock
+from django.test import TestCase
+from peka.store import *
+from .base import PekaTest
+
+class DeepSizeTests(TestCase):
+
+    def test_containers_include_contents(self):
+        self.assertGreater(deep_size(["a" * 1000]), deep_size(["a"]))
+        self.assertGreater(deep_size({"key": "a" * 1000}), 1000)
+    
+
+    def test_shared_objects_counted_once(self):
+        shared = "a" * 1000
+        self.assertLess(deep_size([shared, shared]), 2000)
+
+
+
+class LoadTests(PekaTest):
+
+    def test_load_reuses_built_object(self):
+        path = os.path.join(self.directory, "iBAQ.json")
+        build = Mock(side_effect=lambda p: object())
+        first = load(build, path, paths=[path])
+        self.assertIs(load(build, path, paths=[path]), first)
+        self.assertEqual(build.call_count, 1)
+    
+
+    def test_load_rebuilds_when_file_changes(self):
+        path = os.path.join(self.directory, "iBAQ.json")
+        build = Mock(side_effect=lambda p: object())
+        first = load(build, path, paths=[path])
+        self.write_json("iBAQ.json", {})
+        self.assertIsNot(load(build, path, paths=[path]), first)
+        self.assertEqual(build.call_count, 2)
+
+
+
+class LruCacheTests(TestCase):
+
+    def test_values_built_once(self):
+        cache = LruCache(2)
+        build = Mock(side_effect=lambda: object())
+        first = cache.get("a", build)
+        self.assertIs(cache.get("a", build), first)
+        self.assertEqual(build.call_count, 1)
+    
+
+    def test_least_recently_used_dropped(self):
+        cache = LruCache(2)
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.get("a", lambda: None)
+        cache.get("c", lambda: 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+
+
+class DatasetTests(PekaTest):
+
+    def test_dataset_loads_all_heatmaps(self):
+        dataset = get_dataset()
+        self.assertEqual(dataset.proteins, self.rbps)
+        self.assertEqual(dataset.motifs, ["GGUCG", "UUUUU", "CUCUC", "GAAGA"])
+        for key, _ in HEATMAPS:
+            self.assertIn(key, dataset.data)
+        self.assertGreater(dataset.load_time, 0)
+        self.assertGreater(dataset.memory, 100000)
+    
+
+    def test_dataset_is_kept_in_memory(self):
+        self.assertIs(get_dataset(), get_dataset())
+    
+
+    def test_dataset_reloads_when_files_change(self):
+        dataset = get_dataset()
+        self.write_json("recall.json", {"rows": []})
+        self.assertIsNot(get_dataset(), dataset)
+        self.assertEqual(get_dataset().data["recall"], {"rows": []})
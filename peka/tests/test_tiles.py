@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from django.test import override_settings
+from peka.heatmaps import Heatmap
+from peka.tiles import *
+from .base import PekaTest
+
+class TileRenderingTests(PekaTest):
+
+    def test_can_render_tile(self):
+        heatmap = Heatmap(
+            ["A", "B"], [1, 2, 3], np.zeros((2, 3)),
+            np.array([[0, 1, 0], [1, 2, 0]]), ["#000000", "#ffffff", "#ff0000"]
+        )
+        image = Image.open(BytesIO(render_tile(heatmap, 4)))
+        self.assertEqual(image.size, (12, 8))
+        self.assertEqual(image.getpixel((0, 0)), (0, 0, 0))
+        self.assertEqual(image.getpixel((5, 3)), (255, 255, 255))
+        self.assertEqual(image.getpixel((7, 7)), (255, 0, 0))
+        self.assertEqual(image.getpixel((11, 7)), (0, 0, 0))
+    
+
+    def test_tile_keys(self):
+        self.assertEqual(tile_key("a", None, 2), tile_key("a", None, 2))
+        self.assertNotEqual(tile_key("a", None, 2), tile_key("a", None, 3))
+        self.assertEqual(len(tile_key("a")), 32)
+
+
+
+class TileCacheTests(PekaTest):
+
+    def test_tile_rendered_once_then_read_from_disk(self):
+        calls = []
+        render = lambda: calls.append(1) or b"PNG"
+        os.makedirs(os.path.join(self.directory, "versions", "v1"))
+        self.assertEqual(get_tile("v1", "key", render), b"PNG")
+        self.assertEqual(get_tile("v1", "key", render), b"PNG")
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tiles, "v1", "key.png")))
+        self.assertEqual(get_tile(UNVERSIONED, "key", render), b"PNG")
+        self.assertEqual(len(calls), 2)
+    
+
+    def test_concurrent_requests_coalesced(self):
+        calls, results = [], []
+        def render():
+            calls.append(1)
+            time.sleep(0.1)
+            return b"PNG"
+        threads = [threading.Thread(
+            target=lambda: results.append(get_tile(UNVERSIONED, "key", render))
+        ) for _ in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b"PNG"] * 8)
+    
+
+    def test_failed_render_not_cached(self):
+        def render():
+            raise ValueError
+        with self.assertRaises(ValueError):
+            get_tile(UNVERSIONED, "key", render)
+        self.assertEqual(get_tile(UNVERSIONED, "key", lambda: b"PNG"), b"PNG")
+    
+
+    def test_tiles_of_removed_versions_pruned(self):
+        os.makedirs(os.path.join(self.directory, "versions", "v1"))
+        os.makedirs(os.path.join(self.directory, "versions", "v2"))
+        get_tile("v1", "key", lambda: b"PNG")
+        get_tile("v2", "key", lambda: b"PNG")
+        os.rmdir(os.path.join(self.directory, "versions", "v1"))
+        self.assertEqual(prune_tiles(), 3)
+        self.assertEqual(sorted(os.listdir(self.tiles)), ["v2"])
+    
+
+    def test_least_recently_used_tiles_pruned(self):
+        with override_settings(PEKA_TILES_SIZE=250):
+            for n in range(2):
+                get_tile(UNVERSIONED, f"key{n}", lambda: b"x" * 100)
+                os.utime(tile_path(UNVERSIONED, f"key{n}"), ns=(n * 10 ** 9, n * 10 ** 9))
+            self.assertEqual(get_tile(UNVERSIONED, "key0", lambda: b""), b"x" * 100)
+            get_tile(UNVERSIONED, "key2", lambda: b"x" * 100)
+            self.assertEqual(sorted(os.listdir(os.path.join(self.tiles, UNVERSIONED))), [
+                "key0.png", "key2.png"
+            ])
+            for n in range(3, 10):
+                get_tile(UNVERSIONED, f"key{n}", lambda: b"x" * 100)
+                self.assertLessEqual(sum(
+                    entry.stat().st_size for entry in
+                    os.scandir(os.path.join(self.tiles, UNVERSIONED))
+                ), 250)
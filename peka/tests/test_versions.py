@@ -0,0 +1,154 @@
+import io
+import os
+import time
+import shutil
+from contextlib import redirect_stderr
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from peka import store, versions
+from peka.store import *
+from peka.versions import *
+from .base import PekaTest
+
+class VersionTest(PekaTest):
+    """Moves the test data into a version directory, v1, and makes it current.
+    A second version, v2, has a main heatmap with different columns."""
+
+    def setUp(self):
+        PekaTest.setUp(self)
+        os.makedirs(os.path.join(self.directory, "versions"))
+        for name in ["v1", "v2"]:
+            shutil.copytree(self.directory, os.path.join(self.directory, "versions", name),
+                ignore=shutil.ignore_patterns("versions"))
+        self.write_json(os.path.join("versions", "v2", "main_heatmap.json"), {
+            "cmap": [], "columns": ["K562-TIA1"], "rows": ["UUUUU"],
+            "matrix": [[{"color": "#ffffff", "value": 1}]]
+        })
+        publish("v1")
+    
+
+    def wait_for_swap(self):
+        swap = versions._swaps.get(self.directory)
+        if swap: swap.join()
+
+
+
+class VersionTests(VersionTest):
+
+    def test_current_version(self):
+        self.assertEqual(current_version(), "v1")
+        self.assertEqual(
+            version_directory("v1"), os.path.join(self.directory, "versions", "v1")
+        )
+        os.remove(os.path.join(self.directory, "current"))
+        self.assertIsNone(current_version())
+        self.assertEqual(version_directory(None), self.directory)
+    
+
+    def test_publishing_builds_bundle(self):
+        self.assertFalse(os.path.exists(os.path.join(version_directory("v2"), "rbp.bundle")))
+        publish("v2")
+        self.assertEqual(current_version(), "v2")
+        self.assertTrue(os.path.exists(os.path.join(version_directory("v2"), "rbp.bundle")))
+        self.assertEqual(get_dataset().proteins, ["K562-TIA1"])
+    
+
+    def test_cannot_publish_missing_version(self):
+        with self.assertRaises(ValueError):
+            publish("v3")
+        self.assertEqual(current_version(), "v1")
+        with self.assertRaises(CommandError):
+            call_command("publish_peka_version", "v3")
+    
+
+    def test_new_version_loaded_in_background(self):
+        self.assertEqual(active_version(), "v1")
+        old = get_dataset(version_directory("v1"))
+        call_command("publish_peka_version", "v2", stdout=open(os.devnull, "w"))
+        self.assertEqual(active_version(), "v1")
+        self.wait_for_swap()
+        self.assertEqual(active_version(), "v2")
+        self.assertIsNot(get_dataset(version_directory("v1")), old)
+    
+
+    def test_failed_version_not_swapped_in(self):
+        active_version()
+        publish("v2")
+        os.remove(os.path.join(version_directory("v2"), "iBAQ.json"))
+        with patch("peka.versions.warm", wraps=warm) as warming:
+            with redirect_stderr(io.StringIO()):
+                self.assertEqual(active_version(), "v1")
+                self.wait_for_swap()
+                self.assertEqual(active_version(), "v1")
+                self.wait_for_swap()
+                self.assertEqual(warming.call_count, 1)
+                with patch("time.monotonic", return_value=time.monotonic() + 61):
+                    self.assertEqual(active_version(), "v1")
+                self.wait_for_swap()
+        self.assertEqual(warming.call_count, 2)
+        shutil.copy(
+            os.path.join(version_directory("v1"), "iBAQ.json"), version_directory("v2")
+        )
+        with patch("time.monotonic", return_value=time.monotonic() + 122):
+            active_version()
+        self.wait_for_swap()
+        self.assertEqual(active_version(), "v2")
+
+
+
+class VersionViewTests(VersionTest):
+
+    def test_responses_give_version(self):
+        response = self.client.get("/peka/entities/")
+        self.assertEqual(response["X-Peka-Version"], "v1")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        publish("v2")
+        self.client.get("/peka/entities/")
+        self.wait_for_swap()
+        response = self.client.get("/peka/entities/")
+        self.assertEqual(response["X-Peka-Version"], "v2")
+        self.assertEqual(response.json()["proteins"], ["K562-TIA1"])
+    
+
+    def test_can_pin_version(self):
+        publish("v2")
+        response = self.client.get("/peka/v/v1/entities/")
+        self.assertEqual(response["X-Peka-Version"], "v1")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response.json()["proteins"], self.rbps)
+        response = self.client.get("/peka/v/v1/matrix?heatmap=main&columns=K562-TIA1")
+        self.assertEqual(response.json()["columns"], ["K562-TIA1"])
+        response = self.client.get("/peka/v/v1/matrix?heatmap=main&columns=XXX")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("Cache-Control", response)
+    
+
+    def test_pinned_versions_unloaded_when_unused(self):
+        os.makedirs(os.path.join(self.directory, "versions"), exist_ok=True)
+        for name in ["v3", "v4"]:
+            shutil.copytree(version_directory("v2"), version_directory(name))
+        self.client.get("/peka/entities/")
+        for name in ["v1", "v2", "v3"]:
+            self.client.get(f"/peka/v/{name}/entities/")
+        loaded = lambda: {name for name in ["v1", "v2", "v3", "v4"] if any(
+            key[1] and key[1][0] == version_directory(name) for key in store._cache
+        )}
+        self.assertEqual(loaded(), {"v1", "v2", "v3"})
+        self.client.get("/peka/v/v4/entities/")
+        self.assertEqual(loaded(), {"v1", "v3", "v4"})
+        self.client.get("/peka/v/v3/entities/")
+        self.client.get("/peka/v/v2/entities/")
+        self.assertEqual(loaded(), {"v1", "v2", "v3"})
+    
+
+    def test_unknown_version(self):
+        for url in ["/peka/v/v3/", "/peka/v/../entities/", "/peka/v/.hidden/entities/"]:
+            self.assertEqual(self.client.get(url).status_code, 404)
+    
+
+    def test_unversioned_data_has_no_version(self):
+        os.remove(os.path.join(self.directory, "current"))
+        response = self.client.get("/peka/entities/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Peka-Version", response)
@@ -0,0 +1,510 @@
+import gzip
+import os
+import json
+import struct
+from io import BytesIO
+from unittest.mock import patch
+from PIL import Image
+from .base import PekaTest
+
+class DataViewTests(PekaTest):
+
+    def test_can_get_data(self):
+        response = self.client.get("/peka/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["columns"], self.rbps)
+        self.assertEqual(len(data["similarity"]["columns"]), 223)
+        self.assertIn("linkage_matrix", data["dendrogram"])
+    
+
+    def test_can_get_entities(self):
+        response = self.client.get("/peka/entities/")
+        self.assertEqual(response.json(), {
+            "proteins": self.rbps, "motifs": ["GGUCG", "UUUUU", "CUCUC", "GAAGA"]
+        })
+    
+
+    def test_can_get_status(self):
+        data = self.client.get("/peka/status").json()
+        self.assertGreater(data["load_time"], 0)
+        self.assertGreater(data["memory"], 0)
+
+
+
+class PreparedResponseTests(PekaTest):
+
+    def test_data_has_etag(self):
+        response = self.client.get("/peka/")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(self.client.get("/peka/")["ETag"], response["ETag"])
+    
+
+    def test_data_can_be_gzipped(self):
+        plain = self.client.get("/peka/")
+        response = self.client.get("/peka/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertNotEqual(response["ETag"], plain["ETag"])
+    
+
+    def test_gzip_only_sent_when_accepted(self):
+        for header, gzipped in [
+            ["gzip", True], ["deflate, GZIP;q=0.5", True], ["*", True],
+            ["gzip;q=0", False], ["gzip; q=0.0, deflate", False],
+            ["*;q=0", False], ["deflate", False], ["gzip;q=0, *", False],
+            ["identity, *;q=0.1", True], ["gzipped", False]
+        ]:
+            response = self.client.get("/peka/", HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response.get("Content-Encoding") == "gzip", gzipped, header)
+    
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get("/peka/")["ETag"]
+        response = self.client.get("/peka/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        gzip_etag = self.client.get("/peka/", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        response = self.client.get("/peka/entities/", HTTP_IF_NONE_MATCH=gzip_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/peka/", HTTP_IF_NONE_MATCH=gzip_etag)
+        self.assertEqual(response.status_code, 304)
+    
+
+    def test_etag_changes_with_data(self):
+        etag = self.client.get("/peka/")["ETag"]
+        self.write_json("recall.json", {"rows": []})
+        response = self.client.get("/peka/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["recall"], {"rows": []})
+
+
+
+class MotifViewTests(PekaTest):
+
+    def setUp(self):
+        PekaTest.setUp(self)
+        self.write_json(os.path.join("motif", "AGGU_full.json"), {"rows": [1]})
+
+
+    def test_can_get_motif(self):
+        response = self.client.get("/peka/motif?sequence=GGUCC")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["rows"], [1])
+        self.assertEqual(data["group"], "AGGU")
+        self.assertEqual(data["group_membets"][:3], ["GGUCG", "GGUCC", "AGGGU"])
+    
+
+    def test_motif_errors(self):
+        response = self.client.get("/peka/motif")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/peka/motif?sequence=XXXXX")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "No such motif"})
+        response = self.client.get("/peka/motif?sequence=CCAGG")
+        self.assertEqual(response.status_code, 404)
+    
+
+    def test_can_get_many_motifs(self):
+        response = self.client.get("/peka/motifs?sequences=GGUCG,CCAGG,XXXXX")
+        data = response.json()
+        self.assertEqual(data["motifs"], {
+            "GGUCG": "AGGU", "CCAGG": "CAGG", "XXXXX": None
+        })
+        self.assertEqual(set(data["groups"]), {"AGGU", "CAGG"})
+        self.assertIn("UCAGG", data["groups"]["CAGG"])
+        response = self.client.get("/peka/motifs")
+        self.assertEqual(response.status_code, 400)
+    
+
+    def test_can_search_motifs(self):
+        response = self.client.get("/peka/motif/search?pattern=RGUGY")
+        self.assertEqual(response.json(), {"pattern": "RGUGY", "motifs": {
+            "AGUGC": "UGCG", "AGUGU": "KGUG", "GGUGC": "UGCG", "GGUGU": "KGUG"
+        }})
+        response = self.client.get("/peka/motif/search?pattern=RGUG")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("5 characters", response.json()["error"])
+        response = self.client.get("/peka/motif/search")
+        self.assertEqual(response.status_code, 400)
+
+
+
+class RbpViewTests(PekaTest):
+
+    def test_can_get_rbp(self):
+        response = self.client.get("/peka/rbp?name=HepG2-TIA1")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data), ["PEKA_score_heatmap", "rbp_heatmap"])
+        self.assertEqual(len(data["rbp_heatmap"]["matrix"]), 40)
+        self.assertEqual(len(data["rbp_heatmap"]["matrix"][0]), 51)
+        self.assertEqual(data["rbp_heatmap"]["columns"][0], -25)
+    
+
+    def test_rbp_errors(self):
+        response = self.client.get("/peka/rbp")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/peka/rbp?name=HepG2-XXX")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "No such RBP"})
+    
+
+    def test_can_get_rbp_fields(self):
+        response = self.client.get(
+            "/peka/rbp?name=HepG2-TIA1&fields=PEKA_score_heatmap.matrix,rbp_heatmap.rows"
+        )
+        data = response.json()
+        self.assertEqual(list(data), ["PEKA_score_heatmap", "rbp_heatmap"])
+        self.assertEqual(list(data["PEKA_score_heatmap"]), ["matrix"])
+        self.assertEqual(len(data["PEKA_score_heatmap"]["matrix"]), 40)
+        self.assertEqual(list(data["rbp_heatmap"]), ["rows"])
+        response = self.client.get("/peka/rbp?name=HepG2-TIA1&fields=rbp_heatmap.xxx")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "No such field: xxx"})
+
+
+
+class RbpBatchViewTests(PekaTest):
+
+    def get_lines(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        self.assertTrue(content.endswith("\n"))
+        return [json.loads(line) for line in content.splitlines()]
+
+
+    def test_can_get_many_rbps(self):
+        lines = self.get_lines("/peka/rbps?names=K562-TIA1,HepG2-AQR")
+        self.assertEqual([line["name"] for line in lines], ["K562-TIA1", "HepG2-AQR"])
+        self.assertEqual(
+            lines[1]["data"], self.client.get("/peka/rbp?name=HepG2-AQR").json()
+        )
+    
+
+    def test_missing_rbps_reported_inline(self):
+        lines = self.get_lines("/peka/rbps?names=HepG2-XXX,HepG2-AQR")
+        self.assertEqual(lines[0], {"name": "HepG2-XXX", "error": "No such RBP"})
+        self.assertIn("data", lines[1])
+    
+
+    def test_can_get_fields_of_many_rbps(self):
+        lines = self.get_lines("/peka/rbps?names=K562-TIA1,HepG2-AQR&fields=rbp_heatmap.rows")
+        self.assertEqual(list(lines[0]["data"]), ["rbp_heatmap"])
+        self.assertEqual(list(lines[1]["data"]["rbp_heatmap"]), ["rows"])
+        lines = self.get_lines("/peka/rbps?names=K562-TIA1&fields=rbp_heatmap.xxx")
+        self.assertEqual(lines, [{"name": "K562-TIA1", "error": "No such field: xxx"}])
+    
+
+    def test_names_required(self):
+        self.assertEqual(self.client.get("/peka/rbps").status_code, 400)
+
+
+
+class MatrixViewTests(PekaTest):
+
+    def test_can_get_dataset_submatrix(self):
+        data = self.client.get("/peka/matrix?heatmap=similarity&columns=0:3").json()
+        similarity = self.client.get("/peka/").json()["similarity"]
+        self.assertEqual(data["rows"], ["similarity score"])
+        self.assertEqual(data["columns"], similarity["columns"][:3])
+        self.assertEqual(data["matrix"], [similarity["matrix"][0][:3]])
+        self.assertEqual(data["cmap"], similarity["cmap"])
+    
+
+    def test_missing_values_served_as_null(self):
+        response = self.client.get("/peka/matrix?heatmap=iBAQ&columns=0:3")
+        data = json.loads(response.content, parse_constant=self.fail)
+        iBAQ = self.client.get("/peka/").json()["iBAQ"]
+        self.assertEqual(data["matrix"], [iBAQ["matrix"][0][:3]])
+        self.assertIsNone(data["matrix"][0][1]["value"])
+    
+
+    def test_can_get_main_submatrix(self):
+        data = self.client.get(
+            "/peka/matrix?heatmap=main&rows=CUCUC,GGUCG&columns=K562-TIA1"
+        ).json()
+        self.assertEqual(data["rows"], ["CUCUC", "GGUCG"])
+        self.assertEqual(data["columns"], ["K562-TIA1"])
+        self.assertEqual([row[0]["value"] for row in data["matrix"]], [2, 4])
+        self.assertNotIn("similarity", data)
+    
+
+    def test_can_get_rbp_submatrix(self):
+        data = self.client.get(
+            "/peka/matrix?rbp=HepG2-AQR&heatmap=rbp_heatmap&rows=0:10&columns=0,1,2"
+        ).json()
+        full = self.client.get("/peka/rbp?name=HepG2-AQR").json()["rbp_heatmap"]
+        self.assertEqual(data["rows"], full["rows"][:10])
+        self.assertEqual(data["columns"], [0, 1, 2])
+        self.assertEqual(data["matrix"], [row[25:28] for row in full["matrix"][:10]])
+        self.assertEqual(data["colors"], full["colors"])
+    
+
+    def test_matrix_errors(self):
+        for url, status in [
+            ["/peka/matrix", 400],
+            ["/peka/matrix?heatmap=dendrogram", 404],
+            ["/peka/matrix?heatmap=xxx", 404],
+            ["/peka/matrix?heatmap=rbp_heatmap&rbp=HepG2-XXX", 404],
+            ["/peka/matrix?heatmap=xxx&rbp=HepG2-AQR", 404],
+            ["/peka/matrix?heatmap=main&rows=XXXXX", 400],
+            ["/peka/matrix?heatmap=main&rows=1:x", 400],
+        ]:
+            self.assertEqual(self.client.get(url).status_code, status)
+    
+
+    def test_repeated_selections_rejected(self):
+        repeated = ",".join([":"] * 100)
+        for url in [
+            f"/peka/matrix?rbp=HepG2-AQR&heatmap=rbp_heatmap&format=binary&rows={repeated}&columns={repeated}",
+            "/peka/matrix?heatmap=main&rows=UUUUU,UUUUU",
+            f"/peka/tile?heatmap=main&rows={repeated}&scale=32",
+            f"/peka/cluster?rbps={repeated}",
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("only be selected once", response.json()["error"])
+
+
+
+class NeighboursViewTests(PekaTest):
+
+    def test_can_get_nearest_rbps(self):
+        data = self.client.get("/peka/neighbours?rbp=HepG2-AQR&k=1").json()
+        self.assertEqual(data["rbp"], "HepG2-AQR")
+        self.assertEqual(data["metric"], "cosine")
+        self.assertEqual(len(data["neighbours"]), 1)
+        self.assertIn(data["neighbours"][0]["name"], self.rbps[1:])
+    
+
+    def test_can_get_nearest_motifs(self):
+        data = self.client.get("/peka/neighbours?motif=GGUCG&metric=pearson").json()
+        self.assertEqual(data["metric"], "pearson")
+        self.assertEqual(len(data["neighbours"]), 3)
+        similarities = [n["similarity"] for n in data["neighbours"]]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+    
+
+    def test_neighbour_errors(self):
+        for url, status in [
+            ["/peka/neighbours", 400],
+            ["/peka/neighbours?rbp=HepG2-AQR&metric=xxx", 400],
+            ["/peka/neighbours?rbp=HepG2-AQR&k=x", 400],
+            ["/peka/neighbours?rbp=HepG2-XXX", 404],
+            ["/peka/neighbours?motif=XXXXX", 404],
+        ]:
+            self.assertEqual(self.client.get(url).status_code, status)
+    
+
+    def test_can_get_rbps_for_motif(self):
+        data = self.client.get("/peka/motif/rbps?motif=UUUUU").json()
+        self.assertEqual(data["motif"], "UUUUU")
+        self.assertEqual({rbp["name"] for rbp in data["rbps"]}, set(self.rbps))
+        data = self.client.get(
+            "/peka/motif/rbps?motif=UUUUU&cell_line=HepG2&max_rank=40&min_score=0"
+        ).json()
+        self.assertEqual({rbp["name"] for rbp in data["rbps"]}, {"HepG2-AQR", "HepG2-TIA1"})
+        self.assertEqual(set(data["rbps"][0]), {"name", "score", "rank"})
+        response = self.client.get("/peka/motif/rbps?motif=UUUUU&max_rank=x")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/peka/motif/rbps")
+        self.assertEqual(response.status_code, 400)
+
+
+
+class ValuesFormatTests(PekaTest):
+
+    def test_can_get_data_values_only(self):
+        cells = self.client.get("/peka/").json()
+        response = self.client.get("/peka/?format=values")
+        data = response.json()
+        self.assertEqual(data["matrix"]["shape"], [4, 3])
+        self.assertEqual(data["matrix"]["values"][:3], [c["value"] for c in cells["matrix"][0]])
+        self.assertEqual(data["similarity"]["matrix"]["shape"], [1, 223])
+        self.assertEqual(data["dendrogram"], cells["dendrogram"])
+        self.assertEqual(data["similarity"]["cmap"], cells["similarity"]["cmap"])
+        self.assertNotEqual(response["ETag"], self.client.get("/peka/")["ETag"])
+        self.assertLess(len(response.content), len(json.dumps(cells)) * 0.75)
+    
+
+    def test_missing_values_served_as_null(self):
+        cells = self.client.get("/peka/").json()
+        response = self.client.get("/peka/?format=values")
+        data = json.loads(response.content, parse_constant=self.fail)
+        self.assertEqual(
+            data["iBAQ"]["matrix"]["values"], [c["value"] for c in cells["iBAQ"]["matrix"][0]]
+        )
+        self.assertIsNone(data["recall"]["matrix"]["values"][1])
+        response = self.client.get("/peka/matrix?heatmap=recall&format=values")
+        data = json.loads(response.content, parse_constant=self.fail)
+        self.assertEqual(data["matrix"]["values"], [c["value"] for c in cells["recall"]["matrix"][0]])
+    
+
+    def test_can_get_rbp_values_only(self):
+        cells = self.client.get("/peka/rbp?name=HepG2-AQR").json()
+        data = self.client.get("/peka/rbp?name=HepG2-AQR&format=values").json()
+        self.assertEqual(data["rbp_heatmap"]["matrix"]["shape"], [40, 51])
+        self.assertEqual(data["rbp_heatmap"]["matrix"]["values"][51], cells["rbp_heatmap"]["matrix"][1][0]["value"])
+        self.assertEqual(data["rbp_heatmap"]["rows"], cells["rbp_heatmap"]["rows"])
+        data = self.client.get(
+            "/peka/rbp?name=HepG2-AQR&format=values&fields=PEKA_score_heatmap.matrix"
+        ).json()
+        self.assertEqual(data["PEKA_score_heatmap"]["matrix"]["shape"], [40, 1])
+        response = self.client.get("/peka/rbps?names=HepG2-AQR&format=values")
+        line = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(line["data"]["rbp_heatmap"]["matrix"]["shape"], [40, 51])
+    
+
+    def test_can_get_binary_matrix(self):
+        cells = self.client.get("/peka/matrix?rbp=HepG2-AQR&heatmap=rbp_heatmap&rows=0:2").json()
+        response = self.client.get(
+            "/peka/matrix?rbp=HepG2-AQR&heatmap=rbp_heatmap&rows=0:2&format=binary"
+        )
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertEqual(response["X-Matrix-Shape"], "2,51")
+        values = struct.unpack("<102f", response.content)
+        self.assertAlmostEqual(values[52], cells["matrix"][1][1]["value"], places=5)
+        data = self.client.get("/peka/matrix?heatmap=main&format=values").json()
+        self.assertEqual(data["matrix"]["shape"], [4, 3])
+    
+
+    def test_invalid_formats(self):
+        for url in [
+            "/peka/?format=xxx", "/peka/?format=binary", "/peka/rbp?name=HepG2-AQR&format=binary",
+            "/peka/rbps?names=HepG2-AQR&format=xxx", "/peka/matrix?heatmap=main&format=xxx"
+        ]:
+            self.assertEqual(self.client.get(url).status_code, 400)
+
+
+
+class TileViewTests(PekaTest):
+
+    def test_can_get_tile(self):
+        response = self.client.get("/peka/tile?heatmap=main&rows=0:2&scale=3")
+        self.assertEqual(response["Content-Type"], "image/png")
+        image = Image.open(BytesIO(response.content))
+        self.assertEqual(image.size, (9, 6))
+        self.assertEqual(image.getpixel((0, 0)), (0, 0, 0))
+        response = self.client.get("/peka/tile?rbp=HepG2-AQR&heatmap=rbp_heatmap")
+        self.assertEqual(Image.open(BytesIO(response.content)).size, (51, 40))
+    
+
+    def test_tile_etags(self):
+        response = self.client.get("/peka/tile?heatmap=main")
+        etag = response["ETag"]
+        response = self.client.get("/peka/tile?heatmap=main", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get("/peka/tile?heatmap=main&scale=2")["ETag"], etag)
+        self.write_json("main_heatmap.json", {
+            "cmap": [], "columns": ["X"], "rows": ["A"],
+            "matrix": [[{"color": "#ffffff", "value": 1}]]
+        })
+        response = self.client.get("/peka/tile?heatmap=main", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Image.open(BytesIO(response.content)).getpixel((0, 0)), (255, 255, 255))
+    
+
+    def test_tile_errors(self):
+        for url, status in [
+            ["/peka/tile", 400],
+            ["/peka/tile?heatmap=main&scale=0", 400],
+            ["/peka/tile?heatmap=main&scale=x", 400],
+            ["/peka/tile?heatmap=main&scale=100", 400],
+            ["/peka/tile?heatmap=xxx", 404],
+            ["/peka/tile?heatmap=main&rows=XXXXX", 400],
+            ["/peka/tile?heatmap=main&rows=5:", 400],
+        ]:
+            self.assertEqual(self.client.get(url).status_code, status)
+        with patch("peka.views.MAX_PIXELS", 1000):
+            self.assertEqual(self.client.get("/peka/tile?heatmap=main&scale=10").status_code, 400)
+            self.assertEqual(self.client.get("/peka/tile?heatmap=main&scale=9").status_code, 200)
+    
+
+    def test_equivalent_selectors_share_tiles(self):
+        etags = {self.client.get(f"/peka/tile?heatmap=main&rows={rows}")["ETag"] for rows in [
+            "0:2", ":2", "0:1,1:2", "GGUCG,UUUUU", ":-2"
+        ]}
+        self.assertEqual(len(etags), 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.tiles, ".unversioned"))), 1)
+
+
+
+class CatalogueViewTests(PekaTest):
+
+    def test_can_get_catalogue(self):
+        data = self.client.get("/peka/catalogue").json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual([rbp["name"] for rbp in data["rbps"]], sorted(self.rbps))
+        self.assertEqual(set(data["rbps"][0]), {
+            "name", "cell_line", "protein", "heatmaps", "top_motifs"
+        })
+    
+
+    def test_can_filter_and_page_catalogue(self):
+        data = self.client.get("/peka/catalogue?prefix=tia&limit=1&offset=1").json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([rbp["name"] for rbp in data["rbps"]], ["K562-TIA1"])
+        data = self.client.get("/peka/catalogue?search=aq&cell_line=HepG2").json()
+        self.assertEqual([rbp["name"] for rbp in data["rbps"]], ["HepG2-AQR"])
+    
+
+    def test_catalogue_errors(self):
+        for url in [
+            "/peka/catalogue?offset=-1", "/peka/catalogue?limit=0",
+            "/peka/catalogue?limit=x", "/peka/catalogue?limit=100000"
+        ]:
+            self.assertEqual(self.client.get(url).status_code, 400)
+
+
+
+class ClusterViewTests(PekaTest):
+
+    def test_can_cluster_subset(self):
+        data = self.client.get(
+            "/peka/cluster?rbps=HepG2-AQR,K562-TIA1&motifs=0:3&method=complete"
+        ).json()
+        self.assertEqual(data["method"], "complete")
+        self.assertEqual(data["rbps"]["labels"], ["HepG2-AQR", "K562-TIA1"])
+        self.assertEqual(len(data["rbps"]["linkage_matrix"]), 1)
+        self.assertEqual(set(data["rbps"]["leaves"]), {"HepG2-AQR", "K562-TIA1"})
+        self.assertEqual(data["motifs"]["labels"], ["GGUCG", "UUUUU", "CUCUC"])
+        self.assertEqual(len(data["motifs"]["linkage_matrix"]), 2)
+    
+
+    def test_cluster_errors(self):
+        for url in [
+            "/peka/cluster?metric=xxx", "/peka/cluster?method=xxx",
+            "/peka/cluster?rbps=HepG2-XXX", "/peka/cluster?motifs=1:x",
+            "/peka/cluster?motifs=10:"
+        ]:
+            self.assertEqual(self.client.get(url).status_code, 400)
+
+
+
+class CompareViewTests(PekaTest):
+
+    def test_can_compare_rbps(self):
+        data = self.client.get("/peka/compare?a=HepG2-TIA1&b=K562-TIA1&top=5").json()
+        self.assertEqual(data["rbps"], ["HepG2-TIA1", "K562-TIA1"])
+        self.assertIn("correlation", data)
+        self.assertEqual(set(data["motifs"][0]), {
+            "motif", "scores", "delta", "ranks", "rank_change"
+        })
+    
+
+    def test_compare_errors(self):
+        for url, status in [
+            ["/peka/compare?a=HepG2-AQR", 400],
+            ["/peka/compare?a=HepG2-AQR&b=K562-TIA1&top=x", 400],
+            ["/peka/compare?a=HepG2-AQR&b=HepG2-XXX", 404],
+        ]:
+            self.assertEqual(self.client.get(url).status_code, status)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import hashlib
+import threading
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from django.conf import settings
+
+MAX_SCALE = 32
+MAX_PIXELS = 2 ** 24
+UNVERSIONED = ".unversioned"
+
+_lock = threading.Lock()
+_rendering = {}
+_cache_sizes = {}
+
+def render_tile(heatmap, scale):
+    """Draws a heatmap as a PNG, with each cell a square of scale x scale
+    pixels."""
+
+    palette = np.array([
+        [int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in heatmap.palette
+    ], dtype=np.uint8)
+    pixels = palette[heatmap.colors]
+    pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    buffer = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def tile_version(directory):
+    """The name tiles rendered from a PEKA data directory are cached under -
+    its version, or a name no version can have if the data isn't
+    versioned."""
+
+    if directory == settings.PEKA_DATA: return UNVERSIONED
+    return os.path.basename(directory)
+
+
+def tile_path(version, key):
+    """The location on disk of a cached tile."""
+
+    return os.path.join(settings.PEKA_TILES, version, f"{key}.png")
+
+
+def prune_tiles():
+    """Deletes the cached tiles of versions of the PEKA data which no longer
+    exist, and then the least recently used tiles until those left take up no
+    more than PEKA_TILES_SIZE bytes. Returns how many bytes are left."""
+
+    versions = os.path.join(settings.PEKA_DATA, "versions")
+    served = set(os.listdir(versions)) if os.path.isdir(versions) else set()
+    served.add(UNVERSIONED)
+    tiles = []
+    if not os.path.isdir(settings.PEKA_TILES): return 0
+    for directory in os.scandir(settings.PEKA_TILES):
+        if not directory.is_dir(): continue
+        if directory.name not in served:
+            shutil.rmtree(directory.path, ignore_errors=True)
+            continue
+        for entry in os.scandir(directory.path):
+            try:
+                stat = entry.stat()
+                tiles.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            except FileNotFoundError: pass
+    size = sum(tile[1] for tile in tiles)
+    for _, tile_size, path in sorted(tiles):
+        if size <= settings.PEKA_TILES_SIZE: break
+        try:
+            os.remove(path)
+        except FileNotFoundError: pass
+        size -= tile_size
+    return size
+
+
+def tile_key(*parts):
+    """Creates a key identifying a tile from everything that determines how it
+    looks. The rows and columns should be those actually selected, rather
+    than the selectors asked for, so that equivalent selectors share a
+    tile."""
+
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def get_tile(version, key, render):
+    """Returns the PNG bytes of a tile, from the on-disk cache if it has
+    already been rendered for this version of the data. Otherwise it's
+    rendered by calling render and saved to the cache.
+
+    If several threads ask for the same tile at once, only the first renders
+    it - the others wait for it to finish and then read what it saved.
+
+    Reading a tile marks it as recently used. This process keeps a running
+    total of the cache's size, and prunes it whenever the total passes
+    PEKA_TILES_SIZE, so each process can only grow the cache by so much
+    before it is brought back down."""
+
+    path = tile_path(version, key)
+    while True:
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)
+            return png
+        except FileNotFoundError: pass
+        with _lock:
+            event = _rendering.get(path)
+            if event is None:
+                event = _rendering[path] = threading.Event()
+                break
+        event.wait()
+    try:
+        png = render()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(png)
+        os.replace(temp_path, path)
+        with _lock:
+            size = _cache_sizes.get(settings.PEKA_TILES)
+            if size is None or size + len(png) > settings.PEKA_TILES_SIZE:
+                _cache_sizes[settings.PEKA_TILES] = prune_tiles()
+            else:
+                _cache_sizes[settings.PEKA_TILES] = size + len(png)
+        return png
+    finally:
+        with _lock:
+            del _rendering[path]
+        event.set()
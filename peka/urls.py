@@ -1,9 +1,24 @@
-from django.urls import path
+from django.urls import include, path
 from .views import *
 
-urlpatterns = [
+views = [
     path("entities/", entities),
     path("rbp", rbp),
+    path("rbps", rbps),
+    path("catalogue", catalogue),
+    path("matrix", matrix),
+    path("tile", tile),
+    path("neighbours", neighbours),
+    path("cluster", cluster),
+    path("compare", compare),
     path("motif", motif),
+    path("motif/search", motif_search),
+    path("motif/rbps", motif_rbps),
+    path("motifs", motifs),
+    path("status", status),
     path("", data),
-]
\ No newline at end of file
+]
+
+urlpatterns = [
+    path("v/<str:version>/", include(views)),
+] + views
@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .store import get_dataset, forget, current_version, version_directory
+from .bundle import get_bundle, open_bundle, forget_derived
+from .motifs import get_motif_groups
+from .catalogue import get_catalogue
+
+_lock = threading.Lock()
+_active = {}
+_swaps = {}
+_failures = {}
+_pinned = {}
+
+def warm(version):
+    """Loads everything that is served from a version of the PEKA data."""
+
+    directory = version_directory(version)
+    get_dataset(directory)
+    get_bundle(directory)
+    get_motif_groups(directory)
+    get_catalogue(directory)
+
+
+def unload(version):
+    """Frees everything loaded from a version of the PEKA data."""
+
+    forget(version_directory(version))
+    forget_derived(version_directory(version))
+
+
+def swap(root, version):
+    """Loads a new version of the PEKA data and then makes it the active
+    version, freeing whatever the previous version had loaded - unless it has
+    been pinned recently, in which case it is left to be freed with the other
+    pinned versions. If the new version can't be loaded, the previous version
+    stays active, and the new version isn't tried again for another
+    PEKA_SWAP_RETRY seconds."""
+
+    try:
+        warm(version)
+        with _lock:
+            previous, _active[root] = _active[root], version
+            _failures.pop(root, None)
+            pinned = previous in _pinned.get(root, {})
+        if previous is not None and previous != version and not pinned:
+            unload(previous)
+    except:
+        with _lock:
+            _failures[root] = (version, time.monotonic() + settings.PEKA_SWAP_RETRY)
+        raise
+    finally:
+        with _lock:
+            del _swaps[root]
+
+
+def active_version():
+    """Returns the version of the PEKA data this process is serving.
+
+    This is normally the current version, but when the current version
+    changes, the previous one carries on being served while the new one is
+    loaded in a background thread. Requests switch over to it only once it is
+    fully loaded, so none of them wait for it, and none see a mix of the two.
+    The first request a process gets just uses the current version."""
+
+    root = settings.PEKA_DATA
+    version = current_version()
+    with _lock:
+        failure = _failures.get(root)
+        if root not in _active:
+            _active[root] = version
+        elif _active[root] != version and root not in _swaps and not (
+            failure and failure[0] == version and time.monotonic() < failure[1]
+        ):
+            _swaps[root] = threading.Thread(
+                target=swap, args=(root, version), daemon=True
+            )
+            _swaps[root].start()
+        return _active[root]
+
+
+def pin(version):
+    """Records that a request has pinned a version of the PEKA data. Apart
+    from the active version, and the current version if it is being swapped
+    in, only the PEKA_PINNED_VERSIONS most recently pinned versions are kept
+    loaded - the rest are freed, and loaded again if they are pinned again."""
+
+    root = settings.PEKA_DATA
+    current = current_version()
+    with _lock:
+        pinned = _pinned.setdefault(root, OrderedDict())
+        pinned[version] = True
+        pinned.move_to_end(version)
+        kept = {_active.get(root), current}
+        others = [v for v in pinned if v not in kept]
+        evicted = others[:max(len(others) - settings.PEKA_PINNED_VERSIONS, 0)]
+        for old in evicted: del pinned[old]
+    for old in evicted: unload(old)
+
+
+def publish(version):
+    """Makes a version of the PEKA data the current version, by pointing the
+    'current' link at it. Its RBP bundle is built first, so that processes
+    only need to map it. The link is replaced by renaming a new link over it,
+    so it always points at one complete version or the other."""
+
+    directory = version_directory(version)
+    if not os.path.exists(os.path.join(directory, "main_heatmap.json")):
+        raise ValueError(f"{directory} is not a PEKA data directory")
+    open_bundle(directory)
+    link = os.path.join(settings.PEKA_DATA, "current")
+    temp_link = f"{link}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.symlink(os.path.join("versions", version), temp_link)
+    os.replace(temp_link, link)
@@ -1,51 +1,336 @@
+import os
 import json
-from django.http import JsonResponse
-
-def data(request):
-    with open("peka/data/main_heatmap.json") as f:
-        data = json.load(f)
-    for key, filename in [
-        ["similarity", "similarity_score"], ["iBAQ", "iBAQ"],
-        ["recall", "recall"], ["introns", "3UTR%_intron%_5UTR+CDS%"],
-        ["noncoding_IDR", "%_noncoding_IDR_peaks"],
-        ["total_IDR", "total_IDR_peaks"], ["dendrogram", "dendrogram"]
-    ]:
-        with open(f"peka/data/{filename}.json") as f:
-            data[key] = json.load(f)
-    return JsonResponse(data)
-
-
-def entities(request):
-    with open("peka/data/main_heatmap.json") as f:
-        data = json.load(f)
+from functools import wraps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from .store import get_dataset, load, read_json, version_directory
+from .motifs import get_motif_groups, get_rbp_motif_index
+from .bundle import get_bundle
+from .neighbours import METRICS
+from .tiles import MAX_SCALE, MAX_PIXELS, get_tile, render_tile, tile_key, tile_version
+from .versions import active_version, pin
+from .clustering import METHODS, dendrogram, clustering_key, get_clustering
+from .comparison import TOP_MOTIFS, get_comparison
+from .catalogue import get_catalogue, PAGE_SIZE, MAX_PAGE_SIZE
+
+FORMATS = ["cells", "values"]
+
+def versioned(view):
+    """Serves a view from one version of the PEKA data, passing it the
+    directory that version is in. If the URL pins a version, that version is
+    used, and as versions never change, the response can be cached forever -
+    only the most recently pinned versions are kept loaded. Otherwise the
+    version this process is currently serving is used. Either way, the
+    version is given in the X-Peka-Version header."""
+
+    @wraps(view)
+    def wrapper(request, version=None):
+        pinned = version is not None
+        if pinned:
+            if version.startswith(".") or not os.path.isdir(version_directory(version)):
+                return JsonResponse({"error": "No such version"}, status=404)
+            pin(version)
+        else:
+            version = active_version()
+        response = view(request, version_directory(version))
+        if version is not None:
+            response["X-Peka-Version"] = version
+        if pinned and response.status_code in [200, 304]:
+            response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+    return wrapper
+
+
+@versioned
+def data(request, directory):
+    encoding = request.GET.get("format", "cells")
+    if encoding == "values":
+        return get_dataset(directory).values_response.respond(request)
+    if encoding != "cells":
+        return JsonResponse({"error": "No such format"}, status=400)
+    return get_dataset(directory).response.respond(request)
+
+
+@versioned
+def entities(request, directory):
+    return get_dataset(directory).entities_response.respond(request)
+
+
+@versioned
+def status(request, directory):
+    dataset = get_dataset(directory)
     return JsonResponse({
-        "proteins": data["columns"], "motifs": data["rows"]
+        "load_time": dataset.load_time, "memory": dataset.memory
     })
 
 
-def rbp(request):
+@versioned
+def rbp(request, directory):
     name = request.GET.get("name")
     if name:
-        try:
-            with open(f"peka/data/rbp/{name}.json") as f:
-                return JsonResponse(json.load(f))
-        except FileNotFoundError:
+        bundle = get_bundle(directory)
+        if name not in bundle:
             return JsonResponse({"error": "No such RBP"}, status=404)
+        encoding = request.GET.get("format", "cells")
+        if encoding not in FORMATS:
+            return JsonResponse({"error": "No such format"}, status=400)
+        values_only = encoding == "values"
+        fields = request.GET.get("fields")
+        if not fields: return JsonResponse(bundle.document(name, values_only))
+        try:
+            return JsonResponse(bundle.project(name, fields.split(","), values_only))
+        except KeyError as e:
+            return JsonResponse({"error": f"No such field: {e.args[0]}"}, status=400)
     return JsonResponse({"error": "No RBP name given"}, status=400)
 
 
-def motif(request):
+@versioned
+def catalogue(request, directory):
+    try:
+        offset = int(request.GET.get("offset", 0))
+        limit = int(request.GET.get("limit", PAGE_SIZE))
+        assert offset >= 0 and 1 <= limit <= MAX_PAGE_SIZE
+    except (ValueError, AssertionError):
+        return JsonResponse({"error": "Invalid offset or limit"}, status=400)
+    found = get_catalogue(directory).find(
+        request.GET.get("prefix"), request.GET.get("search"),
+        request.GET.get("cell_line")
+    )
+    return JsonResponse({
+        "count": len(found), "offset": offset, "limit": limit,
+        "rbps": found[offset:offset + limit]
+    })
+
+
+@versioned
+def rbps(request, directory):
+    names = request.GET.get("names")
+    if names:
+        bundle = get_bundle(directory)
+        encoding = request.GET.get("format", "cells")
+        if encoding not in FORMATS:
+            return JsonResponse({"error": "No such format"}, status=400)
+        fields = request.GET.get("fields")
+        return StreamingHttpResponse((json.dumps(rbp_line(
+            bundle, name, fields.split(",") if fields else None, encoding == "values"
+        ),
+            cls=DjangoJSONEncoder
+        ) + "\n" for name in names.split(",")), content_type="application/x-ndjson")
+    return JsonResponse({"error": "No RBP names given"}, status=400)
+
+
+def rbp_line(bundle, name, fields, values_only):
+    """Creates the object representing one RBP in a batch of RBPs - either its
+    data, or the reason it can't be provided."""
+
+    if name not in bundle: return {"name": name, "error": "No such RBP"}
+    if not fields: return {"name": name, "data": bundle.document(name, values_only)}
+    try:
+        return {"name": name, "data": bundle.project(name, fields, values_only)}
+    except KeyError as e:
+        return {"name": name, "error": f"No such field: {e.args[0]}"}
+
+
+def requested_heatmap(request, directory):
+    """Gets the part of a heatmap a request asks for, along with the version
+    of the data it came from. If the request is invalid, a response saying
+    why is returned in place of these."""
+
+    key = request.GET.get("heatmap")
+    if not key:
+        return None, None, JsonResponse({"error": "No heatmap given"}, status=400)
+    name = request.GET.get("rbp")
+    if name:
+        bundle = get_bundle(directory)
+        if name not in bundle:
+            return None, None, JsonResponse({"error": "No such RBP"}, status=404)
+        if key not in bundle.rbps[name]:
+            return None, None, JsonResponse({"error": "No such heatmap"}, status=404)
+        heatmap, version = bundle.heatmap(name, key), bundle.version
+    else:
+        dataset = get_dataset(directory)
+        try:
+            heatmap, version = dataset.heatmap(key), dataset.version
+        except KeyError:
+            return None, None, JsonResponse({"error": "No such heatmap"}, status=404)
+    try:
+        heatmap = heatmap.select(request.GET.get("rows"), request.GET.get("columns"))
+    except KeyError as e:
+        return None, None, JsonResponse(
+            {"error": f"No such row or column: {e.args[0]}"}, status=400
+        )
+    except ValueError as e:
+        return None, None, JsonResponse({"error": e.args[0]}, status=400)
+    return heatmap, version, None
+
+
+@versioned
+def matrix(request, directory):
+    encoding = request.GET.get("format", "cells")
+    if encoding not in FORMATS + ["binary"]:
+        return JsonResponse({"error": "No such format"}, status=400)
+    heatmap, _, error = requested_heatmap(request, directory)
+    if error: return error
+    if encoding == "binary":
+        response = HttpResponse(
+            heatmap.values.astype("<f4").tobytes(),
+            content_type="application/octet-stream"
+        )
+        response["X-Matrix-Shape"] = ",".join(map(str, heatmap.values.shape))
+        return response
+    return JsonResponse(heatmap.to_json(encoding == "values"))
+
+
+@versioned
+def tile(request, directory):
+    try:
+        scale = int(request.GET.get("scale", 1))
+        assert 1 <= scale <= MAX_SCALE
+    except (ValueError, AssertionError):
+        return JsonResponse({"error": f"Scale must be 1 to {MAX_SCALE}"}, status=400)
+    heatmap, version, error = requested_heatmap(request, directory)
+    if error: return error
+    if not heatmap.values.size:
+        return JsonResponse({"error": "No cells selected"}, status=400)
+    if heatmap.values.size * scale ** 2 > MAX_PIXELS:
+        return JsonResponse({"error": f"Tiles can have at most {MAX_PIXELS} pixels"}, status=400)
+    key = tile_key(
+        version, request.GET.get("rbp") or None, request.GET.get("heatmap"),
+        heatmap.rows, heatmap.columns, scale
+    )
+    etag = f'"{key}"'
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    else:
+        png = get_tile(tile_version(directory), key, lambda: render_tile(heatmap, scale))
+        response = HttpResponse(png, content_type="image/png")
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@versioned
+def cluster(request, directory):
+    metric = request.GET.get("metric", "cosine")
+    if metric not in METRICS:
+        return JsonResponse({"error": "No such metric"}, status=400)
+    method = request.GET.get("method", "average")
+    if method not in METHODS:
+        return JsonResponse({"error": "No such method"}, status=400)
+    dataset = get_dataset(directory)
+    try:
+        heatmap = dataset.heatmap("main").select(
+            request.GET.get("motifs"), request.GET.get("rbps")
+        )
+    except KeyError as e:
+        return JsonResponse({"error": f"No such RBP or motif: {e.args[0]}"}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": e.args[0]}, status=400)
+    if not heatmap.values.size:
+        return JsonResponse({"error": "No RBPs or motifs selected"}, status=400)
+    key = clustering_key(dataset.version, heatmap.rows, heatmap.columns, metric, method)
+    return JsonResponse(get_clustering(key, lambda: {
+        "metric": metric, "method": method,
+        "rbps": dendrogram(heatmap.columns, heatmap.values.T, metric, method),
+        "motifs": dendrogram(heatmap.rows, heatmap.values, metric, method)
+    }))
+
+
+@versioned
+def neighbours(request, directory):
+    axis = "rbp" if "rbp" in request.GET else "motif" if "motif" in request.GET else None
+    if not axis:
+        return JsonResponse({"error": "No RBP or motif given"}, status=400)
+    metric = request.GET.get("metric", "cosine")
+    if metric not in METRICS:
+        return JsonResponse({"error": "No such metric"}, status=400)
+    try:
+        k = int(request.GET.get("k", 10))
+    except ValueError:
+        return JsonResponse({"error": "Invalid k"}, status=400)
+    try:
+        nearest = get_dataset(directory).profiles(axis, metric).nearest(request.GET[axis], k)
+    except KeyError:
+        return JsonResponse({"error": f"No such {axis}"}, status=404)
+    return JsonResponse({axis: request.GET[axis], "metric": metric, "neighbours": [
+        {"name": name, "similarity": similarity} for name, similarity in nearest
+    ]})
+
+
+@versioned
+def compare(request, directory):
+    a, b = request.GET.get("a"), request.GET.get("b")
+    if not a or not b:
+        return JsonResponse({"error": "Two RBPs needed"}, status=400)
+    try:
+        top = int(request.GET.get("top", TOP_MOTIFS))
+    except ValueError:
+        return JsonResponse({"error": "Invalid top"}, status=400)
+    index = get_rbp_motif_index(directory)
+    for name in [a, b]:
+        if name not in index.entries:
+            return JsonResponse({"error": f"No such RBP: {name}"}, status=404)
+    return JsonResponse(get_comparison(index, a, b, top))
+
+
+@versioned
+def motif(request, directory):
     sequence = request.GET.get("sequence")
     if sequence:
-        with open("peka/data/motif/motif_groups.tsv") as f:
-            groups = [l.split("\t") for l in f.read().splitlines()]
-        for group in groups:
-            print(group)
-            if sequence in group[1].split(", "):
-                with open(f"peka/data/motif/{group[0]}_full.json") as f:
-                    data = json.load(f)
-                    data["group"] = group[0]
-                    data["group_membets"] = group[1].split(", ")
-                    return JsonResponse(data)
-        return JsonResponse({"error": "No such motif"}, status=404)
-    return JsonResponse({"error": "No motif sequence given"}, status=400)
\ No newline at end of file
+        groups = get_motif_groups(directory)
+        group = groups.group(sequence)
+        if group is None:
+            return JsonResponse({"error": "No such motif"}, status=404)
+        path = os.path.join(directory, "motif", f"{group}_full.json")
+        try:
+            data = load(read_json, path, paths=[path])
+        except FileNotFoundError:
+            return JsonResponse({"error": "No data for motif group"}, status=404)
+        return JsonResponse({
+            **data, "group": group, "group_membets": groups.groups[group]
+        })
+    return JsonResponse({"error": "No motif sequence given"}, status=400)
+
+
+@versioned
+def motif_search(request, directory):
+    pattern = request.GET.get("pattern")
+    if pattern:
+        try:
+            found = get_motif_groups(directory).search(pattern)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse({"pattern": pattern, "motifs": found})
+    return JsonResponse({"error": "No motif pattern given"}, status=400)
+
+
+@versioned
+def motif_rbps(request, directory):
+    motif = request.GET.get("motif")
+    if motif:
+        try:
+            max_rank = int(request.GET["max_rank"]) if "max_rank" in request.GET else None
+            min_score = float(request.GET["min_score"]) if "min_score" in request.GET else None
+        except ValueError:
+            return JsonResponse({"error": "Invalid rank or score"}, status=400)
+        found = get_rbp_motif_index(directory).rbps(
+            motif, max_rank, min_score, request.GET.get("cell_line")
+        )
+        return JsonResponse({"motif": motif, "rbps": [
+            {"name": name, "score": score, "rank": rank} for name, score, rank in found
+        ]})
+    return JsonResponse({"error": "No motif given"}, status=400)
+
+
+@versioned
+def motifs(request, directory):
+    sequences = request.GET.get("sequences")
+    if sequences:
+        groups = get_motif_groups(directory)
+        found = {sequence: groups.group(sequence) for sequence in sequences.split(",")}
+        return JsonResponse({"motifs": found, "groups": {
+            group: groups.groups[group] for group in set(found.values()) if group
+        }})
+    return JsonResponse({"error": "No motif sequences given"}, status=400)
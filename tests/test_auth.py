@@ -1,4 +1,5 @@
 import kirjava
+from unittest.mock import patch
 import base64
 import requests
 import jwt
@@ -8,6 +9,7 @@ import os
 import re
 from django.conf import settings
 from django.core import mail
+from django.contrib.auth import hashers
 from django.contrib.auth.hashers import check_password
 from .base import FunctionalTest, TokenFunctionaltest
 from core.models import User, Group, GroupInvitation
@@ -171,6 +173,32 @@ class LoginTests(FunctionalTest):
         self.assertLess(time.time() - self.user.last_login, 10)
     
 
+    def test_login_upgrades_outdated_password_hash(self):
+        hasher = hashers.PBKDF2PasswordHasher()
+        self.user.password = hasher.encode("livetogetha", hasher.salt(), iterations=1000)
+        self.user.save()
+        result = self.client.execute("""mutation { login(
+            username: "jack", password: "livetogetha",
+        ) { accessToken } }""")
+        self.assertIn("accessToken", result["data"]["login"])
+        self.user.refresh_from_db()
+        algorithm, iterations, salt, hash_ = self.user.password.split("$")
+        self.assertEqual(int(iterations), 150000)
+    
+
+    def test_login_throttled(self):
+        for _ in range(10):
+            self.check_query_error("""mutation { login(
+                username: "jack", password: "wrongpassword"
+            ) { accessToken} }""", message="Invalid credentials")
+        with patch("core.mutations.check_password") as check:
+            self.check_query_error("""mutation { login(
+                username: "jack", password: "livetogetha"
+            ) { accessToken} }""", message="Too many attempts")
+            self.assertFalse(check.called)
+        self.assertFalse("refresh_token" in self.client.session.cookies)
+    
+
     def test_login_can_fail(self):
         # Incorrect username
         self.check_query_error("""mutation { login(
@@ -210,13 +238,50 @@ class TokenRefreshTests(FunctionalTest):
         self.assertLess(time.time() - payload["iat"], 10)
         self.assertLess(time.time() - payload["expires"] - 900, 10)
 
-        # A new HTTP-only cookie has been set with the refresh token
+        # The refresh token isn't reissued, and its session has been used
+        self.assertEqual(
+            self.client.session.cookies["refresh_token"], original_refresh_token
+        )
+        self.assertEqual(self.user.sessions.count(), 1)
+        session = self.user.sessions.get()
+        self.assertLess(time.time() - session.last_used, 10)
+    
+
+    def test_refresh_token_renewed_near_expiry(self):
+        with patch("time.time", return_value=time.time() - 31536000 + 86400):
+            original_refresh_token = self.user.make_refresh_jwt()
+        cookie_obj = requests.cookies.create_cookie(
+            domain="localhost.local", name="refresh_token",
+            value=original_refresh_token
+        )
+        self.client.session.cookies.set_cookie(cookie_obj)
+        result = self.client.execute("{ accessToken }")
+        self.assertIn("accessToken", result["data"])
+
+        # A new HTTP-only cookie has been set with a new refresh token
         refresh_token = self.client.session.cookies["refresh_token"]
-        algorithm, payload, secret = access_token.split(".")
-        payload = json.loads(base64.b64decode(payload + "==="))
+        self.assertNotEqual(refresh_token, original_refresh_token)
+        payload = jwt.decode(refresh_token, settings.SECRET_KEY)
         self.assertEqual(payload["sub"], self.user.id)
         self.assertLess(time.time() - payload["iat"], 10)
         self.assertLess(time.time() - payload["expires"] - 31536000, 10)
+
+        # The old session is gone
+        self.assertEqual(
+            list(self.user.sessions.values_list("jti", flat=True)), [payload["jti"]]
+        )
+    
+
+    def test_revoked_refresh_token_rejected(self):
+        refresh_token = self.user.make_refresh_jwt()
+        self.user.sessions.all().delete()
+        cookie_obj = requests.cookies.create_cookie(
+            domain="localhost.local", name="refresh_token", value=refresh_token
+        )
+        self.client.session.cookies.set_cookie(cookie_obj)
+        self.check_query_error(
+            "{ accessToken }", message="Refresh token not valid"
+        )
     
 
     def test_token_refresh_can_fail(self):
@@ -262,6 +327,7 @@ class LogoutTests(TokenFunctionaltest):
 
         # Cookie set
         self.assertTrue("refresh_token" in self.client.session.cookies)
+        self.assertEqual(self.user.sessions.count(), 1)
 
         # Log out
         result = self.client.execute("mutation { logout { success } }")
@@ -269,6 +335,9 @@ class LogoutTests(TokenFunctionaltest):
         # Cookie gone
         self.assertTrue(result["data"]["logout"]["success"])
         self.assertFalse("refresh_token" in self.client.session.cookies)
+
+        # The session is revoked
+        self.assertEqual(self.user.sessions.count(), 0)
     
 
     def test_logout_works_without_cookie(self):
@@ -419,6 +488,8 @@ class UserQueryTests(TokenFunctionaltest):
 class PasswordUpdateTests(TokenFunctionaltest):
 
     def test_can_update_password(self):
+        other_jti = jwt.decode(self.user.make_refresh_jwt(), settings.SECRET_KEY)["jti"]
+
         # Send new password
         result = self.client.execute("""mutation { updatePassword(
             current: "livetogetha", new: "warwick96"
@@ -428,6 +499,12 @@ class PasswordUpdateTests(TokenFunctionaltest):
         self.assertEqual(result["data"], {"updatePassword": {"success": True}})
         self.user.refresh_from_db()
         self.assertTrue(check_password("warwick96", self.user.password))
+
+        # Existing sessions are revoked, and this client gets a new one
+        refresh_token = self.client.session.cookies["refresh_token"]
+        jti = jwt.decode(refresh_token, settings.SECRET_KEY)["jti"]
+        self.assertEqual(list(self.user.sessions.values_list("jti", flat=True)), [jti])
+        self.assertNotEqual(jti, other_jti)
     
 
     def test_can_validate_updated_password(self):
@@ -474,6 +551,8 @@ class PasswordUpdateTests(TokenFunctionaltest):
 class PasswordResetTests(FunctionalTest):
 
     def test_can_reset_password(self):
+        self.user.make_refresh_jwt()
+
         # Request a password reset
         result = self.client.execute("""mutation { requestPasswordReset(
             email: "jack@gmail.com"
@@ -498,6 +577,7 @@ class PasswordResetTests(FunctionalTest):
 
         # Server reports success
         self.assertTrue(result["data"]["resetPassword"]["success"])
+        self.assertEqual(self.user.sessions.count(), 0)
 
         # User can log in with new credentials
         result = self.client.execute("""mutation { login(